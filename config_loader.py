@@ -0,0 +1,105 @@
+import os
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import yaml
+
+# System-generated columns, placed before the pattern-matching fields
+SYSTEM_FIELDS = ("order_number", "email_date")
+
+
+@dataclass(frozen=True, eq=False)
+class PatternField:
+    name: str
+    pattern: re.Pattern
+    excel_column: str
+
+
+@dataclass(frozen=True, eq=False)
+class FieldConfig:
+    """
+    Parsed field_config.yaml, shared read-only by imap, extract_fields and excel.
+    - raw: the YAML content as nested read-only mappings
+    - pattern_fields: fields with both a pattern and an excel_column, patterns pre-compiled
+    - title_pattern: compiled email_title pattern, or None
+    - column_order: preferred Excel column order (system columns first)
+    """
+    raw: MappingProxyType
+    pattern_fields: tuple
+    title_pattern: re.Pattern | None
+    column_order: tuple
+
+    @property
+    def order_number_column(self):
+        return self.raw.get("order_number", {}).get("excel_column", "OrderNo")
+
+    @property
+    def email_date_column(self):
+        return self.raw.get("email_date", {}).get("excel_column", "EmailDate")
+
+    @property
+    def title_column(self):
+        return self.raw.get("email_title", {}).get("excel_column", "NrComClient")
+
+    @property
+    def part_code_column(self):
+        return self.raw.get("order_id", {}).get("excel_column", "CodInitialComClient")
+
+
+# Absolute config path -> (mtime, FieldConfig)
+_cache = {}
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _build_config(config):
+    pattern_fields = tuple(
+        PatternField(field, re.compile(props["pattern"]), props["excel_column"])
+        for field, props in config.items()
+        if props.get("pattern") and props.get("excel_column")
+    )
+
+    title = config.get("email_title", {}).get("pattern")
+
+    column_order = []
+    for field in SYSTEM_FIELDS:
+        excel_column = config.get(field, {}).get("excel_column")
+        if excel_column:
+            column_order.append(excel_column)
+    for f in pattern_fields:
+        if f.name not in SYSTEM_FIELDS:
+            column_order.append(f.excel_column)
+
+    return FieldConfig(
+        raw=_freeze(config),
+        pattern_fields=pattern_fields,
+        title_pattern=re.compile(title) if title else None,
+        column_order=tuple(column_order),
+    )
+
+
+def load_field_config(config_path="field_config.yaml"):
+    """
+    Load field_config.yaml, parsing it and compiling its patterns only once.
+    The cached config is reloaded when the file's modification time changes,
+    so a long-running process picks up edits.
+    """
+    path = os.path.abspath(config_path)
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    field_config = _build_config(config)
+    _cache[path] = (mtime, field_config)
+    return field_config
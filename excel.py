@@ -1,8 +1,9 @@
+import itertools
 import os
 from dotenv import load_dotenv
 from openpyxl import Workbook
 from datetime import datetime
-import yaml
+from config_loader import load_field_config
 
 load_dotenv()
 
@@ -13,31 +14,15 @@ def get_column_order(config_path="field_config.yaml"):
     Get the preferred column order from the config file.
     System columns (order_number, email_date) come first, followed by pattern fields.
     """
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
-    
-    # Define system columns that should appear first
-    system_fields = ['order_number', 'email_date']
-    ordered_columns = []
-    
-    # Add system columns first
-    for field in system_fields:
-        if field in config:
-            excel_column = config[field].get('excel_column')
-            if excel_column:
-                ordered_columns.append(excel_column)
-    
-    # Add pattern-matching fields
-    for field, props in config.items():
-        if field not in system_fields and props.get('pattern') and props.get('excel_column'):
-            ordered_columns.append(props['excel_column'])
-    
-    return ordered_columns
+    return list(load_field_config(config_path).column_order)
 
 def generate_timestamped_filename(base_path=None):
     """
     Generate a timestamped Excel filename based on the current date and time.
     Format: YYYY-MM-DD_HH-MM-SS_original_filename.xlsx
+    If that file already exists (several files created within the same second, e.g. by
+    the watch loop flushing batches back to back), a counter is added:
+    YYYY-MM-DD_HH-MM-SS-2_original_filename.xlsx, -3, ...
     """
     if base_path is None:
         base_path = os.getenv("EXCEL_PATH")
@@ -55,8 +40,12 @@ def generate_timestamped_filename(base_path=None):
     # Create timestamped filename
     timestamped_filename = f"{timestamp}_{name}{ext}"
     
-    # Create full path
+    # Create full path, never reusing the name of an existing file
     timestamped_path = os.path.join(dir_name, timestamped_filename)
+    counter = 2
+    while os.path.exists(timestamped_path):
+        timestamped_path = os.path.join(dir_name, f"{timestamp}-{counter}_{name}{ext}")
+        counter += 1
     
     # Ensure directory exists
     if dir_name and not os.path.exists(dir_name):
@@ -64,6 +53,32 @@ def generate_timestamped_filename(base_path=None):
     
     return timestamped_path
 
+def write_rows(excel_path, columns, rows):
+    """
+    Write a header and rows to a new Excel file using a write-only workbook.
+    Rows (lists of cell values, any iterable) are streamed to disk as they are
+    appended instead of being kept as cell objects in memory.
+    If anything fails, no partially written file is left behind.
+    Returns the number of rows written.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    count = 0
+    try:
+        for row in rows:
+            ws.append(row)
+            count += 1
+        wb.save(excel_path)
+    except Exception:
+        # Discard the streamed rows and don't leave a half-written file behind
+        if not ws.closed:
+            ws.close()
+        if os.path.exists(excel_path):
+            os.remove(excel_path)
+        raise
+    return count
+
 def export_to_excel(data, excel_path=None):
     """
     Creates a new Excel file with a timestamped filename for each run.
@@ -84,7 +99,7 @@ def export_to_excel(data, excel_path=None):
     # Get preferred column order from configuration
     preferred_columns = get_column_order()
     
-    # Determine all columns present in the data
+    # Determine all columns present in the data (a first pass over the row dicts only)
     all_columns = set()
     for row in data:
         all_columns.update(row.keys())
@@ -101,20 +116,52 @@ def export_to_excel(data, excel_path=None):
         if col not in columns:
             columns.append(col)
 
-    # Always create a new workbook with timestamped filename
-    wb = Workbook()
-    ws = wb.active
-    ws.append(columns)
-
-    for row in data:
-        # Ensure order matches columns
-        ws.append([row.get(col, "") for col in columns])
-
-    wb.save(excel_path)
+    # Always create a new workbook with timestamped filename, streaming rows in column order
+    write_rows(excel_path, columns, ([row.get(col, "") for col in columns] for row in data))
     print(f"Excel file created successfully with {len(data)} rows and columns: {', '.join(columns)}")
     return excel_path
 
 
+def export_rows_streaming(rows, excel_path=None, columns=None):
+    """
+    Creates a new Excel file with a timestamped filename, writing rows as they are produced.
+    rows can be any iterable of dicts (e.g. a generator); they are not kept in memory.
+    Columns come from the configuration (system columns first), since the rows
+    are not known up front.
+    Returns (excel_path, row_count), or (None, 0) if there were no rows. No file is created then.
+    """
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is None:
+        print("No data to export. Skipping Excel file creation.")
+        return None, 0
+
+    if columns is None:
+        config = load_field_config()
+        columns = get_column_order()
+        for col in (config.email_date_column, config.order_number_column):
+            if col not in columns:
+                columns.insert(0, col)
+
+    if excel_path is None:
+        excel_path = generate_timestamped_filename()
+
+    print(f"Creating Excel file: {excel_path}")
+
+    count = write_rows(
+        excel_path, columns, ([row.get(col, "") for col in columns] for row in itertools.chain([first_row], rows))
+    )
+    print(f"Excel file created successfully with {count} rows and columns: {', '.join(columns)}")
+    return excel_path, count
+
+
+def normalize_search_term(value):
+    """
+    Normalize an ID value for searching and matching: surrounding whitespace removed, upper case.
+    """
+    return str(value).strip().upper()
+
+
 def read_excel_input(file_path, id_column):
     """
     Read an input Excel file and return search terms plus the original data.
@@ -172,10 +219,11 @@ def export_scraper_excel(original_rows, original_columns, scraper_results, id_co
         print("No data to export. Skipping Excel file creation.")
         return None
 
-    # Build lookup: id_value -> merged scraper dict
+    # Build lookup: normalized id_value -> merged scraper dict
+    # (one result fans out to every row with the same normalized ID)
     scraper_lookup = {}
     for result in scraper_results:
-        id_val = str(result.get(id_column, "")).strip()
+        id_val = normalize_search_term(result.get(id_column, ""))
         if id_val:
             if id_val in scraper_lookup:
                 scraper_lookup[id_val].update(result)
@@ -194,21 +242,18 @@ def export_scraper_excel(original_rows, original_columns, scraper_results, id_co
 
     all_columns = original_columns + new_columns
 
-    wb = Workbook()
-    ws = wb.active
-    ws.append(all_columns)
-
-    for row in original_rows:
-        id_val = str(row.get(id_column, "")).strip()
-        scraper_data = scraper_lookup.get(id_val, {})
-        combined = []
-        for col in all_columns:
-            if col in original_set:
-                combined.append(row.get(col, ""))
-            else:
-                combined.append(scraper_data.get(col, ""))
-        ws.append(combined)
+    def merged_rows():
+        for row in original_rows:
+            id_val = normalize_search_term(row.get(id_column, ""))
+            scraper_data = scraper_lookup.get(id_val, {})
+            combined = []
+            for col in all_columns:
+                if col in original_set:
+                    combined.append(row.get(col, ""))
+                else:
+                    combined.append(scraper_data.get(col, ""))
+            yield combined
 
-    wb.save(excel_path)
+    write_rows(excel_path, all_columns, merged_rows())
     print(f"Scraper Excel created: {excel_path} ({len(original_rows)} rows, columns: {', '.join(all_columns)})")
     return excel_path
@@ -4,18 +4,30 @@ import email
 from email.header import decode_header
 import os
 from dotenv import load_dotenv
-import yaml
 import re
+import socket
+import time
+from config_loader import load_field_config
 
 IMAP_SERVER = None
 IMAP_PORT = None
+FETCH_CHUNK_SIZE = 100
 mail = None
+# Sync state reached by the last get_unread_emails call, saved by the caller on success
+last_scan = None
+
+# Headers needed to filter an email before downloading its body
+HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (SUBJECT DATE FROM)]"
+
+# Seconds to wait for the server to acknowledge IDLE or DONE before treating the connection as dead
+IDLE_REPLY_TIMEOUT = 30
 
 def init():
-  global IMAP_SERVER, IMAP_PORT
+  global IMAP_SERVER, IMAP_PORT, FETCH_CHUNK_SIZE
   load_dotenv()
   IMAP_SERVER = os.getenv("IMAP_SERVER")
   IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+  FETCH_CHUNK_SIZE = int(os.getenv("IMAP_FETCH_CHUNK_SIZE", FETCH_CHUNK_SIZE))
 
 def authenticate():
   global mail
@@ -38,17 +50,140 @@ def authenticate():
 
 def fetch_email_by_id(email_id):
   """
-  Fetch the raw email data for a given email ID.
+  Fetch the raw email data for a given email UID.
   Returns the raw bytes of the email, or None if fetch fails.
   Does not mark the email as read.
   """
   global mail
-  status, msg_data = mail.fetch(email_id, "(BODY.PEEK[])")
+  status, msg_data = mail.uid("FETCH", email_id, "(BODY.PEEK[])")
   if status != "OK" or not msg_data or not msg_data[0]:
     print(f"Failed to fetch email {email_id.decode()}")
     return None
   return msg_data[0][1]
 
+def _parse_size(envelope):
+  """
+  Read the RFC822.SIZE value from a FETCH response envelope like b'1 (RFC822.SIZE 1234 BODY[...] {56}'.
+  Returns 0 if the size is missing.
+  """
+  match = re.search(rb"RFC822\.SIZE (\d+)", envelope)
+  return int(match.group(1)) if match else 0
+
+def build_message_set(email_ids):
+  """
+  Build an IMAP message set from a list of email UIDs, collapsing consecutive IDs into ranges.
+  For example [b'1', b'2', b'3', b'7'] becomes '1:3,7'.
+  """
+  numbers = sorted({int(i) for i in email_ids})
+  ranges = []
+  start = prev = None
+  for n in numbers:
+    if start is None:
+      start = prev = n
+    elif n == prev + 1:
+      prev = n
+    else:
+      ranges.append(f"{start}:{prev}" if start != prev else str(start))
+      start = prev = n
+  if start is not None:
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+  return ",".join(ranges)
+
+def parse_fetch_response(msg_data):
+  """
+  Split a multi-message UID FETCH response into per-message parts.
+  Returns a dict: {uid (bytes): (envelope, data)}, where envelope holds all
+  non-literal response text for the message (e.g. UID, RFC822.SIZE) and data is the literal.
+  """
+  messages = []
+  for item in msg_data:
+    if isinstance(item, tuple):
+      messages.append([item[0], item[1]])
+    elif isinstance(item, bytes) and messages:
+      # Data items sent after the literal, e.g. b' UID 1234)'
+      messages[-1][0] += item
+
+  parts = {}
+  for envelope, data in messages:
+    match = re.search(rb"UID (\d+)", envelope)
+    # Fall back to the sequence number if the server left out the UID
+    key = match.group(1) if match else envelope.split(b" ", 1)[0]
+    parts[key] = (envelope, data)
+  return parts
+
+def fetch_in_chunks(email_ids, items, chunk_size=None):
+  """
+  Fetch the given data items for many emails, sending one UID FETCH per chunk of UIDs.
+  Yields (uid, envelope, data) tuples in the order of email_ids.
+  If the server rejects a chunk, its emails are fetched one at a time instead.
+  """
+  global mail
+  chunk_size = chunk_size or FETCH_CHUNK_SIZE
+  for i in range(0, len(email_ids), chunk_size):
+    chunk = email_ids[i:i + chunk_size]
+    try:
+      status, msg_data = mail.uid("FETCH", build_message_set(chunk), items)
+      if status != "OK":
+        raise imaplib.IMAP4.error(f"FETCH returned {status}")
+      parts = parse_fetch_response(msg_data)
+    except imaplib.IMAP4.error as e:
+      print(f"Batched fetch of {len(chunk)} emails failed ({e}), fetching one at a time")
+      parts = {}
+      for num in chunk:
+        try:
+          status, msg_data = mail.uid("FETCH", num, items)
+        except imaplib.IMAP4.error as e:
+          print(f"IMAP error fetching email {num.decode()}: {e}")
+          continue
+        if status == "OK" and msg_data:
+          parts.update(parse_fetch_response(msg_data))
+
+    for num in chunk:
+      if num not in parts:
+        print(f"Failed to fetch email {num.decode()}")
+        continue
+      envelope, data = parts[num]
+      yield num, envelope, data
+
+def fetch_headers(email_ids, chunk_size=None):
+  """
+  Fetch the Subject, Date and From headers plus the full message size for many emails.
+  Returns a list of (email_id, header_bytes, size) tuples.
+  """
+  return [
+    (num, data, _parse_size(envelope))
+    for num, envelope, data in fetch_in_chunks(email_ids, f"(RFC822.SIZE {HEADER_FIELDS})", chunk_size)
+  ]
+
+def store_flags(uids, op, flag="\\Flagged", chunk_size=None):
+  """
+  Add (op='+FLAGS') or remove (op='-FLAGS') a flag on many emails, sending one UID STORE per chunk.
+  If a chunk fails, its emails are retried one at a time.
+  Returns the list of UIDs that could not be updated.
+  """
+  global mail
+  chunk_size = chunk_size or FETCH_CHUNK_SIZE
+  failed = []
+  for i in range(0, len(uids), chunk_size):
+    chunk = uids[i:i + chunk_size]
+    try:
+      status, _ = mail.uid("STORE", build_message_set(chunk), op, flag)
+      if status == "OK":
+        continue
+      error = f"STORE returned {status}"
+    except Exception as e:
+      error = e
+    print(f"Failed to store {op} {flag} on {len(chunk)} emails ({error}), retrying one at a time")
+    for uid in chunk:
+      try:
+        status, _ = mail.uid("STORE", uid, op, flag)
+        if status != "OK":
+          raise imaplib.IMAP4.error(f"STORE returned {status}")
+      except Exception as e:
+        print(f"Failed to store {op} {flag} on email {uid.decode()}: {e}")
+        failed.append(uid)
+  return failed
+
 def parse_email_from_bytes(raw_bytes):
   """
   Parse an email.message.Message object from raw bytes and extract sender, subject, and body.
@@ -83,7 +218,7 @@ def parse_title_from_bytes(raw_bytes):
     Returns the decoded subject as a string.
     """
     msg = email.message_from_bytes(raw_bytes)
-    subject, encoding = decode_header(msg["Subject"])[0]
+    subject, encoding = decode_header(msg["Subject"] or "")[0]
     if isinstance(subject, bytes):
         subject = subject.decode(encoding or "utf-8", errors="ignore")
     return subject
@@ -102,53 +237,149 @@ def filter_by_title(title, config_path="field_config.yaml"):
     """
     Returns True if the title matches the email_title pattern in field_config.yaml, else False.
     """
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
-    pattern = config.get("email_title", {}).get("pattern")
-    if not pattern:
+    pattern = load_field_config(config_path).title_pattern
+    if pattern is None:
         return False
-    return re.search(pattern, title) is not None
+    return pattern.search(title) is not None
 
-def get_unread_emails(limit=None):
+def get_uidvalidity():
   """
-  Retrieve unread and unflagged emails from the inbox.
-  If limit is given, only fetch up to that many emails.
-  Returns a list of email objects.
+  Return the UIDVALIDITY of the selected mailbox as an int, or None if the server did not report it.
+  UIDs are only comparable between runs while UIDVALIDITY stays the same.
+  """
+  global mail
+  _, data = mail.response("UIDVALIDITY")
+  if not data or data[0] is None:
+    status, data = mail.status("inbox", "(UIDVALIDITY)")
+    if status != "OK" or not data or data[0] is None:
+      return None
+    match = re.search(rb"UIDVALIDITY (\d+)", data[0])
+    return int(match.group(1)) if match else None
+  return int(data[0])
+
+def search_unread_uids(since_uid=None):
+  """
+  Search for UNSEEN and UNFLAGGED emails in the selected mailbox.
+  If since_uid is given, only emails with a higher UID are returned.
+  Returns a sorted list of UIDs (bytes), or None if the search fails.
   """
   global mail
+  criteria = ["UNSEEN", "UNFLAGGED"]
+  if since_uid is not None:
+    criteria.insert(0, f"UID {since_uid + 1}:*")
+  status, messages = mail.uid("SEARCH", None, *criteria)
+  if status != "OK":
+    return None
+  uids = sorted(messages[0].split(), key=int)
+  if since_uid is not None:
+    # "n:*" always matches the newest email, even when its UID is below n
+    uids = [uid for uid in uids if int(uid) > since_uid]
+  return uids
+
+def iter_unread_emails(limit=None, sync_state=None, raw=False, uids=None):
+  """
+  Generator version of get_unread_emails: yields email objects as their bodies are
+  downloaded, so only one fetch chunk of emails is held in memory at a time.
+  If uids is given, those emails are processed instead of searching the mailbox.
+  IMAP errors are raised to the caller.
+  last_scan is set once the generator has been fully consumed.
+  """
+  global mail, last_scan
+  last_scan = None
   if mail is None:
     print("Not authenticated. Please login first.")
     authenticate()
-    return []
+    return
+
+  mail.select("inbox")
+  uidvalidity = get_uidvalidity()
+  _, data = mail.response("UIDNEXT")
+  uidnext = int(data[0]) if data and data[0] is not None else None
+  since_uid = None
+  if sync_state and uidvalidity is not None and sync_state.get("uidvalidity") == uidvalidity:
+    since_uid = sync_state.get("last_uid")
+  elif sync_state:
+    print("Mailbox UIDVALIDITY changed, doing a full scan.")
+
+  if uids is not None:
+    email_ids = sorted(uids, key=int)
+    print(f"Emails to process: {len(email_ids)}\n")
+  else:
+    # Only fetch emails that are UNSEEN and UNFLAGGED. UIDs (unlike sequence
+    # numbers) stay stable when other emails arrive or are expunged mid-run.
+    email_ids = search_unread_uids(since_uid)
+    if email_ids is None:
+      raise imaplib.IMAP4.error("Failed to search for unread emails.")
+
+    if since_uid is not None:
+      print(f"New unread and unflagged emails since UID {since_uid}: {len(email_ids)}\n")
+    else:
+      print(f"Unread and unflagged emails: {len(email_ids)}\n")
+
+  truncated = limit is not None and len(email_ids) > limit
+  if truncated:
+    email_ids = email_ids[:limit]
 
-  emails = []
+  # Phase 1: fetch only the headers and filter on the subject
+  matching_ids = []
+  fetched_ids = set()
+  header_bytes_total = 0
+  skipped_bytes = 0
+  for num, header_bytes, size in fetch_headers(email_ids):
+    fetched_ids.add(num)
+    header_bytes_total += len(header_bytes)
+    title = parse_title_from_bytes(header_bytes)
+    print(f"Filtering email: {title}")
+    if filter_by_title(title):
+      print(f"Email matches filter")
+      matching_ids.append(num)
+    else:
+      skipped_bytes += size
+
+  print(f"Header prefetch: {len(matching_ids)}/{len(email_ids)} emails match, "
+        f"skipped {skipped_bytes} body bytes for {header_bytes_total} header bytes "
+        f"(saved {skipped_bytes - header_bytes_total} bytes)\n")
+
+  # Phase 2: download full bodies only for the matching emails, one chunk at a time
+  downloaded_ids = set()
+  for num, _, raw_bytes in fetch_in_chunks(matching_ids, "(BODY.PEEK[])"):
+    downloaded_ids.add(num)
+    if raw:
+      yield {'uid': num, 'raw': raw_bytes}
+      continue
+    email_obj = parse_email_from_bytes(raw_bytes)
+    # Add the UID to the email object for later flagging
+    email_obj['uid'] = num
+    yield email_obj
+
+  # Advance the high-water mark only up to the first email that could not be fetched,
+  # so it is scanned again next run
+  failed = [int(uid) for uid in email_ids if uid not in fetched_ids]
+  failed += [int(uid) for uid in matching_ids if uid not in downloaded_ids]
+  if uidvalidity is not None:
+    if failed:
+      last_uid = min(failed) - 1
+    elif truncated or uids is not None:
+      # Emails above the last one processed have not been looked at yet
+      last_uid = int(email_ids[-1]) if email_ids else 0
+    else:
+      # Everything up to UIDNEXT was searched, including read or flagged emails
+      last_uid = max(uidnext - 1 if uidnext else 0, int(email_ids[-1]) if email_ids else 0)
+    last_scan = {"uidvalidity": uidvalidity, "last_uid": max(last_uid, since_uid or 0)}
+
+def get_unread_emails(limit=None, sync_state=None, raw=False, uids=None):
+  """
+  Retrieve unread and unflagged emails from the inbox.
+  If limit is given, only fetch up to that many emails.
+  If raw is True, emails are not parsed and each object is {'uid': ..., 'raw': bytes}.
+  If sync_state ({'uidvalidity': ..., 'last_uid': ...}) is given and the mailbox
+  UIDVALIDITY still matches, only emails newer than last_uid are searched.
+  If uids is given, only those emails are fetched, without searching.
+  After the call, last_scan holds the sync state to save once the emails are processed.
+  Returns a list of email objects.
+  """
   try:
-    mail.select("inbox")
-    # Only fetch emails that are UNSEEN and UNFLAGGED
-    status, messages = mail.search(None, "UNSEEN", "UNFLAGGED")
-    if status != "OK":
-      print("Failed to search for unread emails.")
-      return []
-
-    email_ids = messages[0].split()
-    print(f"Unread and unflagged emails: {len(email_ids)}\n")
-
-    if limit is not None:
-      email_ids = email_ids[:limit]
-
-    for num in email_ids:
-      raw_bytes = fetch_email_by_id(num)
-      if not raw_bytes:
-        continue
-      title = parse_title_from_bytes(raw_bytes)
-      print(f"Filtering email: {title}")
-      if filter_by_title(title):
-        print(f"Email matches filter")
-        email_obj = parse_email_from_bytes(raw_bytes)
-        # Add the email id (UID) to the email object for later flagging
-        email_obj['uid'] = num
-        emails.append(email_obj)
-    return emails
+    return list(iter_unread_emails(limit, sync_state, raw, uids))
   except imaplib.IMAP4.error as e:
     print(f"IMAP error: {e}")
     return []
@@ -156,6 +387,107 @@ def get_unread_emails(limit=None):
     print(f"An error occurred: {e}")
     return []
 
+def supports_idle():
+  """Return True if the server advertises the IDLE capability (RFC 2177)."""
+  return mail is not None and "IDLE" in mail.capabilities
+
+def _read_idle_line(deadline):
+  """
+  Read one response line (without CRLF) while in IDLE, or return None if the
+  deadline passes first. Lines are read through imaplib's own buffered file, with
+  a socket timeout, so bytes imaplib has already buffered are seen and nothing is
+  taken from the stream behind its back.
+  """
+  remaining = deadline - time.monotonic()
+  if remaining <= 0:
+    return None
+  previous_timeout = mail.sock.gettimeout()
+  mail.sock.settimeout(remaining)
+  try:
+    line = mail.readline()
+  except socket.timeout:
+    # A socket file cannot be read again after a timeout. Servers send each
+    # response line whole, so the timeout did not cut one in half
+    mail.file = mail.sock.makefile("rb")
+    return None
+  finally:
+    mail.sock.settimeout(previous_timeout)
+  if not line:
+    raise imaplib.IMAP4.abort("Connection closed during IDLE")
+  return line.rstrip(b"\r\n")
+
+def idle(timeout):
+  """
+  Wait in IMAP IDLE on the selected mailbox until the server reports new mail
+  (an untagged EXISTS) or timeout seconds pass, then end the IDLE with DONE.
+  Returns True if new mail arrived, False on timeout.
+  imaplib has no IDLE support before Python 3.14, so the command is sent by hand.
+  Raises imaplib.IMAP4.abort if the connection is dropped.
+  """
+  global mail
+  tag = mail._new_tag()
+  try:
+    return _idle(tag, timeout)
+  finally:
+    # _new_tag registers the tag for imaplib's reply handling, which the hand-read
+    # reply bypasses: drop it, or every IDLE cycle would leave an entry behind
+    mail.tagged_commands.pop(tag, None)
+
+def _idle(tag, timeout):
+  mail.send(tag + b" IDLE\r\n")
+  line = _read_idle_line(time.monotonic() + IDLE_REPLY_TIMEOUT)
+  if line is None:
+    raise imaplib.IMAP4.abort("No reply to IDLE")
+  if not line.startswith(b"+"):
+    raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='replace')}")
+
+  new_mail = False
+  deadline = time.monotonic() + timeout
+  while not new_mail:
+    line = _read_idle_line(deadline)
+    if line is None:
+      break
+    if line.startswith(b"* BYE"):
+      raise imaplib.IMAP4.abort(f"Server closed the connection: {line.decode(errors='replace')}")
+    new_mail = line.startswith(b"* ") and line.endswith(b" EXISTS")
+
+  mail.send(b"DONE\r\n")
+  deadline = time.monotonic() + IDLE_REPLY_TIMEOUT
+  while True:
+    line = _read_idle_line(deadline)
+    if line is None:
+      raise imaplib.IMAP4.abort("No reply to DONE")
+    if line.startswith(tag):
+      if not line.startswith(tag + b" OK"):
+        raise imaplib.IMAP4.error(f"IDLE failed: {line.decode(errors='replace')}")
+      return new_mail
+    new_mail = new_mail or (line.startswith(b"* ") and line.endswith(b" EXISTS"))
+
+def poll(interval):
+  """
+  Fallback for servers without IDLE: wait interval seconds, then send a NOOP.
+  Returns True if the server reported a new message count (EXISTS) since the last check.
+  """
+  global mail
+  # Drop EXISTS responses left over from earlier commands
+  mail.response("EXISTS")
+  time.sleep(interval)
+  status, _ = mail.noop()
+  if status != "OK":
+    raise imaplib.IMAP4.abort("NOOP failed")
+  _, data = mail.response("EXISTS")
+  return bool(data and data[0] is not None)
+
+def disconnect():
+  """Drop the connection without logging out, after it has failed."""
+  global mail
+  if mail is not None:
+    try:
+      mail.shutdown()
+    except Exception:
+      pass
+  mail = None
+
 def logout():
   print("Logging out...")
   mail.logout()
\ No newline at end of file
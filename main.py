@@ -1,87 +1,123 @@
 import argparse
 import imap
-from extract_fields import extract_fields_from_emails
+from extract_fields import iter_fields_from_emails, iter_fields_from_raw_emails
 import excel
+import store
+import sync_state
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 EXCEL_PATH = os.getenv("EXCEL_PATH")
 
-def flag_emails_as_processed(emails):
-    # Mark each email as flagged (\Flagged) using imap
+def collect_uids(emails, action):
+    # Gather the UIDs of the emails, reporting any email that has none
+    uids = []
     for email in emails:
         uid = email.get('uid')
         if uid:
-            try:
-                imap.mail.store(uid, '+FLAGS', '\\Flagged')
-            except Exception as e:
-                print(f"Failed to flag email {uid}: {e}")
+            uids.append(uid)
         else:
             subj = email.get('subject', '[No Subject]')
             sender = email.get('from', '[No From]')
-            print(f"No email id found for flagging. Subject: {subj}, From: {sender}")
+            print(f"No email UID found for {action}. Subject: {subj}, From: {sender}")
+    return uids
+
+def flag_emails_as_processed(emails):
+    # Mark all emails as flagged (\Flagged) with one UID STORE per chunk
+    failed = imap.store_flags(collect_uids(emails, 'flagging'), '+FLAGS')
+    if failed:
+        print(f"Failed to flag {len(failed)} emails: {', '.join(uid.decode() for uid in failed)}")
 
 def unflag_emails(emails):
-    # Remove the \Flagged flag from each email using imap
-    for email in emails:
-        uid = email.get('uid')
-        if uid:
-            try:
-                imap.mail.store(uid, '-FLAGS', '\\Flagged')
-            except Exception as e:
-                print(f"Failed to unflag email {uid}: {e}")
-        else:
-            subj = email.get('subject', '[No Subject]')
-            sender = email.get('from', '[No From]')
-            print(f"No email id found for unflagging. Subject: {subj}, From: {sender}")
+    # Remove the \Flagged flag from all emails with one UID STORE per chunk
+    failed = imap.store_flags(collect_uids(emails, 'unflagging'), '-FLAGS')
+    if failed:
+        print(f"Failed to unflag {len(failed)} emails: {', '.join(uid.decode() for uid in failed)}")
 
+def save_sync_state():
+    # Remember how far the inbox was scanned so the next run only searches newer emails
+    if imap.last_scan:
+        try:
+            sync_state.save_state(imap.last_scan)
+        except Exception as e:
+            print(f"Warning: Could not save sync state: {e}")
+
+
+def update_master():
+    # Merge new timestamped files into the master workbook, if MASTER_EXCEL_PATH is set.
+    # The timestamped file is already saved, so a failure here only delays the merge to the next run.
+    if not os.getenv("MASTER_EXCEL_PATH"):
+        return
+    from master import sync_master
+    try:
+        master_path, files, appended, updated = sync_master()
+        if files:
+            print(f"Master workbook updated: {master_path} ({appended} new rows, {updated} updated)")
+    except Exception as e:
+        print(f"Warning: Could not update master workbook: {e}")
 
-def process_emails():
+
+def process_emails(workers=1, uids=None):
     """
     Main processing function that handles the email-to-Excel workflow.
+    Emails stream from IMAP through extraction into the Excel file, so only one
+    fetch chunk of emails is held in memory; only their UIDs are kept for flagging.
+    With workers > 1, emails are parsed and extracted in that many worker processes.
+    If uids is given, only those emails are processed instead of searching for unread ones.
+    Every row is also recorded in the data store, committed together with the Excel file.
     Returns a tuple: (success: bool, created_file_path: str or None, processed_emails_count: int)
     """
+    # Lightweight record (uid, subject, from) of every email written to the Excel file
     emails = []
-    extracted_data = []
     created_excel_path = None
+    data_store = None
     
     try:
-        # Step 1: Fetch unread emails
+        data_store = store.DataStore()
+
+        # Step 1 and 2: Fetch unread emails and extract their data, one at a time
         print("Fetching unread emails...")
-        emails = imap.get_unread_emails()
+        unread = imap.iter_unread_emails(sync_state=sync_state.load_state(), raw=workers > 1, uids=uids)
+        if workers > 1:
+            print(f"Extracting data from emails with {workers} worker processes...")
+            extracted = iter_fields_from_raw_emails(unread, workers)
+        else:
+            extracted = iter_fields_from_emails(unread)
+
+        def rows():
+            for email, row in extracted:
+                emails.append({key: email.get(key) for key in ('uid', 'subject', 'from')})
+                data_store.add_order(row, uid=email.get('uid'))
+                yield row
+        
+        # Step 3: Create Excel file while the rows are produced
+        created_excel_path, _ = excel.export_rows_streaming(rows())
         
         if not emails:
             print("No unread emails found matching the filter criteria.")
+            save_sync_state()
             return True, None, 0
         
-        print(f"Found {len(emails)} emails to process")
-        
-        # Step 2: Extract data from emails
-        print("Extracting data from emails...")
-        extracted_data = extract_fields_from_emails(emails)
-        
-        if not extracted_data or all(not row for row in extracted_data):
-            print("No valid data could be extracted from the emails.")
-            # Still flag the emails as processed to avoid reprocessing
-            flag_emails_as_processed(emails)
-            return True, None, len(emails)
-        
-        # Step 3: Create Excel file
-        print("Creating Excel file...")
-        created_excel_path = excel.export_to_excel(extracted_data)
-        
         if not created_excel_path:
             raise Exception("Failed to create Excel file")
         
+        print(f"Processed {len(emails)} emails")
+        data_store.commit()
+        
         # Step 4: Mark emails as processed only after successful Excel creation
         print("Marking emails as processed...")
         flag_emails_as_processed(emails)
+        save_sync_state()
         
         return True, created_excel_path, len(emails)
         
     except Exception as e:
         print(f"Error during processing: {e}")
+
+        # Cleanup: Drop the rows recorded in the data store during this run
+        if data_store is not None:
+            data_store.rollback()
         
         # Cleanup: Remove the Excel file if it was created
         if created_excel_path and os.path.exists(created_excel_path):
@@ -97,9 +133,12 @@ def process_emails():
             unflag_emails(emails)
         
         return False, None, len(emails)
+    finally:
+        if data_store is not None:
+            data_store.close()
 
 
-def run_email():
+def run_email(workers=1):
     """Run the email module. Returns True on success."""
     print("=== Email Processing Started ===")
     imap.init()
@@ -108,12 +147,13 @@ def run_email():
         return False
 
     try:
-        success, created_file, processed_count = process_emails()
+        success, created_file, processed_count = process_emails(workers)
 
         if success:
             if created_file:
                 print(f"\nProcessed {processed_count} emails and created Excel file:")
                 print(f"   {created_file}")
+                update_master()
             else:
                 print(f"\nProcessed {processed_count} emails (no data to export)")
         else:
@@ -131,13 +171,96 @@ def run_email():
         print("=== Email Processing Completed ===")
 
 
-def run_scrape():
+def run_watch(workers=1):
+    """Run the email module as a daemon that processes new emails as they arrive."""
+    from watch import watch
+
+    print("=== Email Watch Started ===")
+    imap.init()
+
+    def process(uids=None):
+        success, created_file, processed_count = process_emails(workers, uids=uids)
+        if not success:
+            print(f"Failed: Processing failed for {processed_count} emails")
+        elif created_file:
+            print(f"Processed {processed_count} emails and created Excel file:")
+            print(f"   {created_file}")
+            update_master()
+        return success
+
+    try:
+        watch(process)
+    except KeyboardInterrupt:
+        print("\nStopping watch...")
+    finally:
+        if imap.mail is not None:
+            try:
+                imap.logout()
+            except Exception as e:
+                print(f"Warning: Error during logout: {e}")
+        print("=== Email Watch Completed ===")
+    return True
+
+
+def run_master():
+    """Build or update the master workbook from the timestamped files. Returns True on success."""
+    from master import sync_master
+
+    print("=== Master Workbook Update Started ===")
+    try:
+        master_path, files, appended, updated = sync_master()
+        if files:
+            print(f"\nMerged {files} files into {master_path}: {appended} new rows, {updated} updated")
+        else:
+            print(f"\nMaster workbook {master_path} is up to date")
+        return True
+    except Exception as e:
+        print(f"\nCritical error in master module: {e}")
+        return False
+    finally:
+        print("=== Master Workbook Update Completed ===")
+
+
+def export_path(prices=False, excel_path=None):
+    # export_<name> next to the timestamped files, so the master merge does not pick it up
+    if excel_path is None:
+        excel_path = EXCEL_PATH or ""
+    name = "prices" if prices else os.path.splitext(os.path.basename(excel_path))[0] or "data"
+    return excel.generate_timestamped_filename(os.path.join(os.path.dirname(excel_path), f"export_{name}.xlsx"))
+
+
+def run_export(date_from=None, date_to=None, prices=False):
+    """Export the orders (or scraped prices) recorded in the data store to an Excel file. Returns True on success."""
+    print("=== Export Started ===")
+    data_store = None
+    try:
+        data_store = store.DataStore()
+        path = export_path(prices)
+        if prices:
+            created_file = excel.export_to_excel(list(data_store.find_prices(date_from=date_from, date_to=date_to)), path)
+        else:
+            created_file, _ = excel.export_rows_streaming(data_store.find_orders(date_from=date_from, date_to=date_to), path)
+        if created_file:
+            print(f"\nExported to {created_file}")
+        else:
+            print("\nNothing recorded in the given date range")
+        return True
+    except Exception as e:
+        print(f"\nCritical error in export: {e}")
+        return False
+    finally:
+        if data_store is not None:
+            data_store.close()
+        print("=== Export Completed ===")
+
+
+def run_scrape(refresh=False):
     """Run the scrape module. Returns True on success."""
     from scrape import process_scrape
 
     print("=== Scrape Processing Started ===")
     try:
-        success, created_file, count = process_scrape()
+        success, created_file, count = process_scrape(refresh=refresh)
 
         if success:
             if created_file:
@@ -162,19 +285,57 @@ if __name__ == "__main__":
         "command",
         nargs="?",
         default="all",
-        choices=["all", "email", "scrape"],
-        help="Which module to run (default: all)",
+        choices=["all", "email", "scrape", "watch", "master", "export"],
+        help="Which module to run (default: all); watch keeps running and processes emails as they arrive, "
+             "master merges the timestamped email files into the master workbook, "
+             "export writes the orders recorded in the data store to an Excel file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for parsing and extracting emails (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached scrape results and scrape every term again",
+    )
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        help="export: first email (or scrape) date to include, YYYY-MM-DD",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        help="export: last email (or scrape) date to include, YYYY-MM-DD",
+    )
+    parser.add_argument(
+        "--prices",
+        action="store_true",
+        help="export: export the scraped prices instead of the orders",
     )
     args = parser.parse_args()
 
+    if args.command == "watch":
+        run_watch(args.workers)
+        exit(0)
+
+    if args.command == "master":
+        exit(0 if run_master() else 1)
+
+    if args.command == "export":
+        exit(0 if run_export(args.date_from, args.date_to, args.prices) else 1)
+
     any_failed = False
 
     if args.command in ("all", "email"):
-        if not run_email():
+        if not run_email(args.workers):
             any_failed = True
 
     if args.command in ("all", "scrape"):
-        if not run_scrape():
+        if not run_scrape(args.refresh):
             any_failed = True
 
     if any_failed:
@@ -0,0 +1,256 @@
+import os
+import re
+import sqlite3
+
+from dotenv import load_dotenv
+from openpyxl import Workbook, load_workbook
+
+from config_loader import load_field_config
+
+load_dotenv()
+
+
+def get_master_path(excel_path=None):
+    """
+    Get the path of the master workbook: MASTER_EXCEL_PATH, or master_<name> next to
+    the timestamped files (EXCEL_PATH).
+    """
+    master_path = os.getenv("MASTER_EXCEL_PATH")
+    if master_path:
+        return master_path
+    if excel_path is None:
+        excel_path = os.getenv("EXCEL_PATH", "")
+    if not excel_path:
+        raise ValueError("Neither MASTER_EXCEL_PATH nor EXCEL_PATH set in .env file.")
+    return os.path.join(os.path.dirname(excel_path), f"master_{os.path.basename(excel_path)}")
+
+
+def find_timestamped_files(excel_path=None):
+    """
+    List the files created by excel.generate_timestamped_filename for EXCEL_PATH,
+    oldest first: by timestamp, then by the counter added to files created in the same second.
+    """
+    if excel_path is None:
+        excel_path = os.getenv("EXCEL_PATH", "")
+    dir_name = os.path.dirname(excel_path)
+    pattern = re.compile(
+        r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:-(\d+))?_" + re.escape(os.path.basename(excel_path)) + "$"
+    )
+    if not os.path.isdir(dir_name or "."):
+        return []
+    found = []
+    for name in os.listdir(dir_name or "."):
+        match = pattern.match(name)
+        if match:
+            found.append(((match.group(1), int(match.group(2) or 1)), os.path.join(dir_name, name)))
+    return [path for _, path in sorted(found)]
+
+
+def read_rows(file_path):
+    """Yield the rows of a workbook's first sheet as dicts keyed by header."""
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        for row in rows:
+            yield {header: value for header, value in zip(headers, row) if header is not None}
+    finally:
+        wb.close()
+
+
+class MasterIndex:
+    """SQLite sidecar of the master workbook.
+
+    Maps each key (NrComClient) to its row in the sheet, so an upsert finds the row
+    to overwrite without scanning the sheet, and records which timestamped files have
+    been merged. The workbook's size and mtime are stored after every save; if the
+    workbook no longer matches (edited or sorted by hand, or a crash between saving
+    the workbook and the index), the key index is rebuilt from the sheet."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS merged_files (name TEXT PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);"
+        )
+        self.conn.commit()
+
+    def get_row(self, key: str) -> int | None:
+        found = self.conn.execute("SELECT row FROM rows WHERE key = ?", (key,)).fetchone()
+        return found[0] if found else None
+
+    def set_row(self, key: str, row: int) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO rows (key, row) VALUES (?, ?)", (key, row))
+
+    def reset(self) -> None:
+        """Forget all rows and merged files, for a master workbook that no longer exists."""
+        self.conn.execute("DELETE FROM rows")
+        self.conn.execute("DELETE FROM merged_files")
+
+    def rebuild(self, keys) -> None:
+        """Replace the key index with (key, row) pairs read from the sheet."""
+        self.conn.execute("DELETE FROM rows")
+        self.conn.executemany("INSERT OR REPLACE INTO rows (key, row) VALUES (?, ?)", keys)
+
+    def is_merged(self, name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM merged_files WHERE name = ?", (name,)).fetchone() is not None
+
+    def mark_merged(self, name: str) -> None:
+        self.conn.execute("INSERT OR IGNORE INTO merged_files (name) VALUES (?)", (name,))
+
+    def get_signature(self) -> str | None:
+        found = self.conn.execute("SELECT value FROM meta WHERE name = 'signature'").fetchone()
+        return found[0] if found else None
+
+    def set_signature(self, signature: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('signature', ?)", (signature,))
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class MasterWorkbook:
+    """
+    Consolidated workbook with one row per key column value (NrComClient).
+    Rows with a new key are appended; rows with a known key overwrite that row.
+    Use open(), upsert() any number of rows, then save().
+    """
+
+    def __init__(self, path=None, key_column=None, config_path="field_config.yaml"):
+        self.path = path or get_master_path()
+        self.config = load_field_config(config_path)
+        self.key_column = key_column or self.config.title_column
+        self.index = None
+        self.wb = None
+        self.ws = None
+        self.columns = []
+
+    def open(self):
+        dir_name = os.path.dirname(self.path)
+        if dir_name and not os.path.exists(dir_name):
+            os.makedirs(dir_name)
+        self.index = MasterIndex(f"{os.path.splitext(self.path)[0]}.index.sqlite")
+
+        if os.path.exists(self.path):
+            self.wb = load_workbook(self.path)
+            self.ws = self.wb.active
+            self.columns = [cell.value for cell in self.ws[1]]
+            if self.index.get_signature() != _signature(self.path):
+                print(f"Master index out of date, rebuilding from {self.path}")
+                self._rebuild_index()
+        else:
+            self.wb = Workbook()
+            self.ws = self.wb.active
+            self.columns = list(self.config.column_order)
+            if self.key_column not in self.columns:
+                self.columns.insert(0, self.key_column)
+            self.ws.append(self.columns)
+            # Start over: every timestamped file is merged into the new master
+            self.index.reset()
+        return self
+
+    def _rebuild_index(self):
+        if self.key_column not in self.columns:
+            raise ValueError(f"Key column '{self.key_column}' not found in master workbook {self.path}")
+        key_idx = self.columns.index(self.key_column)
+        keys = []
+        for row_number, row in enumerate(self.ws.iter_rows(min_row=2, values_only=True), start=2):
+            key = row[key_idx] if key_idx < len(row) else None
+            if key is not None and str(key).strip():
+                keys.append((str(key).strip(), row_number))
+        self.index.rebuild(keys)
+
+    def upsert(self, row):
+        """Write one row dict. Returns True if it was appended, False if it replaced an existing row."""
+        for col in row:
+            if col not in self.columns:
+                self.columns.append(col)
+                self.ws.cell(row=1, column=len(self.columns), value=col)
+
+        key = row.get(self.key_column)
+        key = str(key).strip() if key is not None else ""
+        row_number = self.index.get_row(key) if key else None
+        appended = row_number is None
+        if appended:
+            row_number = self.ws.max_row + 1
+            if key:
+                self.index.set_row(key, row_number)
+        for col_idx, col in enumerate(self.columns, start=1):
+            if col in row or not appended:
+                self.ws.cell(row=row_number, column=col_idx, value=row.get(col, ""))
+        return appended
+
+    def merge_file(self, file_path):
+        """Upsert every row of a timestamped file and record it as merged. Returns (appended, updated)."""
+        appended = updated = 0
+        for row in read_rows(file_path):
+            if self.upsert(row):
+                appended += 1
+            else:
+                updated += 1
+        self.index.mark_merged(os.path.basename(file_path))
+        return appended, updated
+
+    def is_merged(self, file_path):
+        return self.index.is_merged(os.path.basename(file_path))
+
+    def save(self):
+        """
+        Save the workbook (to a temporary file first, so a failed save leaves the
+        previous master intact), then commit the index with the new file signature.
+        """
+        tmp_path = f"{self.path}.tmp"
+        try:
+            self.wb.save(tmp_path)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            self.index.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.index.set_signature(_signature(self.path))
+        self.index.commit()
+
+    def close(self):
+        if self.wb is not None:
+            self.wb.close()
+        if self.index is not None:
+            self.index.close()
+
+
+def sync_master(master_path=None, excel_path=None):
+    """
+    Merge every timestamped file not yet in the master workbook, oldest first, so newer
+    rows win for the same NrComClient. The first call builds the master from all existing
+    files; later calls only merge the files created since.
+    Returns (master_path, files_merged, rows_appended, rows_updated).
+    """
+    master = MasterWorkbook(master_path).open()
+    try:
+        pending = [path for path in find_timestamped_files(excel_path) if not master.is_merged(path)]
+        appended = updated = 0
+        for path in pending:
+            file_appended, file_updated = master.merge_file(path)
+            appended += file_appended
+            updated += file_updated
+            print(f"Merged {os.path.basename(path)}: {file_appended} new rows, {file_updated} updated")
+        if pending:
+            master.save()
+        return master.path, len(pending), appended, updated
+    finally:
+        master.close()
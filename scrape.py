@@ -1,10 +1,15 @@
+import asyncio
 import os
+import threading
+import time
 
 import yaml
 from dotenv import load_dotenv
 
 import excel
+import store
 from scrapers import SCRAPER_CLASSES
+from scrapers.cache import PriceCache
 
 load_dotenv()
 
@@ -24,35 +29,158 @@ def resolve_input_path():
     return os.path.join(base_dir, scraper_input) if base_dir else scraper_input
 
 
-def run_scrapers(config, search_terms):
-    """Run all scraper classes on the given search terms. Returns list of result dicts."""
-    all_results = []
+def dedupe_search_terms(search_terms):
+    """Drop repeated terms (compared with surrounding whitespace stripped), keeping first-seen order.
+    Spellings that differ in case are all searched, since the supplier's anr is matched exactly;
+    the export joins every spelling's result back to the rows by the normalized term."""
+    return list(dict.fromkeys(str(term).strip() for term in search_terms))
+
+
+def open_cache(config):
+    """Open the scraper result cache configured under `cache`, or return None if not configured.
+    A relative cache path is resolved next to SCRAPER_PATH."""
+    cache_config = config.get("cache")
+    if not cache_config:
+        return None
+    path = cache_config.get("path", "scraper_cache.sqlite")
+    if not os.path.isabs(path):
+        base_dir = os.path.dirname(os.getenv("SCRAPER_PATH", ""))
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+            path = os.path.join(base_dir, path)
+    ttl_hours = cache_config.get("ttl_hours", 6)
+    return PriceCache(path, ttl_hours * 3600)
+
+
+def run_scraper(scraper, search_terms):
+    """Run one scraper's authenticate/scrape/close lifecycle. Returns its result dicts,
+    or None if it failed. Async-capable scrapers get their own event loop."""
+    if scraper.supports_async:
+        return asyncio.run(run_scraper_async(scraper, search_terms))
+    try:
+        print(f"[{scraper.name}] Authenticating...")
+        if not scraper.authenticate():
+            print(f"[{scraper.name}] Authentication failed, skipping")
+            return None
+
+        print(f"[{scraper.name}] Scraping {len(search_terms)} terms...")
+        results = scraper.scrape(search_terms)
+        print(f"[{scraper.name}] Got {len(results)} results")
+        return results
+
+    except Exception as e:
+        print(f"[{scraper.name}] Error: {e}")
+        return None
+    finally:
+        scraper.close()
+
+
+async def run_scraper_async(scraper, search_terms):
+    """Async counterpart of run_scraper, using the scraper's async_* methods."""
+    try:
+        print(f"[{scraper.name}] Authenticating...")
+        if not await scraper.async_authenticate():
+            print(f"[{scraper.name}] Authentication failed, skipping")
+            return None
+
+        print(f"[{scraper.name}] Scraping {len(search_terms)} terms (async)...")
+        results = await scraper.async_scrape(search_terms)
+        print(f"[{scraper.name}] Got {len(results)} results")
+        return results
+
+    except Exception as e:
+        print(f"[{scraper.name}] Error: {e}")
+        return None
+    finally:
+        await scraper.async_close()
+
+
+def run_scrapers(config, search_terms, cache=None, refresh=False, data_store=None):
+    """Run all scraper classes on the given search terms. Returns list of result dicts.
+    Each scraper runs in its own thread, so suppliers are scraped in parallel; a scraper
+    still running after its `timeout` (seconds, from scraper_config.yaml) is abandoned.
+    With a cache, terms scraped within the TTL are served from it (unless refresh is set)
+    and fresh results are stored in it. With a data store, fresh results are recorded there."""
+    jobs = []
     for scraper_cls in SCRAPER_CLASSES:
         scraper = scraper_cls()
+        scraper_config = config.get(scraper.name, {})
+        job = {"scraper": scraper, "cached": [], "results": None, "thread": None,
+               "timeout": scraper_config.get("timeout")}
+        jobs.append(job)
         try:
-            scraper_config = config.get(scraper.name, {})
-            scraper.columns = scraper_config.get("columns", {})
+            scraper.configure(scraper_config)
+        except Exception as e:
+            print(f"[{scraper.name}] Error: {e}")
+            continue
 
-            print(f"[{scraper.name}] Authenticating...")
-            if not scraper.authenticate():
-                print(f"[{scraper.name}] Authentication failed, skipping")
+        terms = search_terms
+        if cache is not None and not refresh:
+            terms = []
+            for term in search_terms:
+                hit, row = cache.get(scraper.name, term)
+                if not hit:
+                    terms.append(term)
+                elif row:
+                    job["cached"].append(row)
+            print(f"[{scraper.name}] {len(search_terms) - len(terms)} terms served from cache")
+            if not terms:
                 continue
 
-            print(f"[{scraper.name}] Scraping {len(search_terms)} terms...")
-            results = scraper.scrape(search_terms)
-            all_results.extend(results)
-            print(f"[{scraper.name}] Got {len(results)} results")
+        def target(job=job, terms=terms):
+            job["results"] = run_scraper(job["scraper"], terms)
 
-        except Exception as e:
-            print(f"[{scraper.name}] Error: {e}")
+        # Daemon threads, so a scraper that hangs past its timeout does not block exit
+        job["thread"] = threading.Thread(target=target, name=f"scraper-{scraper.name}", daemon=True)
+        job["thread"].start()
+
+    # Merge in SCRAPER_CLASSES order, whatever order the scrapers finish in
+    all_results = []
+    started = time.monotonic()
+    for job in jobs:
+        scraper = job["scraper"]
+        all_results.extend(job["cached"])
+        thread = job["thread"]
+        if thread is None:
+            continue
+
+        timeout = job["timeout"]
+        thread.join(None if timeout is None else max(0, started + timeout - time.monotonic()))
+        if thread.is_alive():
+            print(f"[{scraper.name}] Timed out after {timeout}s, skipping its results")
+            continue
+        if job["results"] is None:
             continue
-        finally:
-            scraper.close()
+        all_results.extend(job["results"])
+
+        if cache is not None:
+            for term, payload in scraper.payloads.items():
+                cache.put(scraper.name, term, payload["row"], payload)
+            cache.commit()
 
+        if data_store is not None:
+            for term, payload in scraper.payloads.items():
+                if payload["row"]:
+                    data_store.add_price(scraper.name, excel.normalize_search_term(term), payload["row"])
+            data_store.commit()
+
+    print_http_stats(job["scraper"] for job in jobs)
     return all_results
 
 
-def process_scrape(search_terms=None):
+def print_http_stats(scrapers):
+    """Print each scraper's request/retry/throttle summary for the run."""
+    for scraper in scrapers:
+        stats = scraper.stats()
+        if not stats.get("requests"):
+            continue
+        print(f"[{scraper.name}] HTTP: {stats['requests']} requests, {stats['retries']} retries, "
+              f"{stats['throttled']} throttled (429), {stats['failed']} gave up; "
+              f"waited {stats['rate_wait']:.1f}s on the rate limit and {stats['backoff_wait']:.1f}s in backoff; "
+              f"final concurrency {stats['concurrency']}")
+
+
+def process_scrape(search_terms=None, refresh=False):
     """
     Web scraping processing function.
     Returns a tuple: (success: bool, file_path: str or None, count: int)
@@ -60,12 +188,26 @@ def process_scrape(search_terms=None):
     If search_terms is None, reads from an input Excel file (SCRAPER_INPUT),
     runs scrapers, and merges results back with original columns.
     If search_terms is provided explicitly, uses the old export_to_excel path.
+    If refresh is True, cached results are ignored and every term is scraped again.
     """
     config = load_scraper_config()
-
+    cache = open_cache(config)
+    data_store = store.DataStore()
+    try:
+        return _process_scrape(config, search_terms, cache, refresh, data_store)
+    finally:
+        data_store.close()
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            if lookups:
+                print(f"Cache hit rate: {cache.hits}/{lookups} ({cache.hit_rate():.0%})")
+            cache.close()
+
+
+def _process_scrape(config, search_terms, cache, refresh, data_store):
     if search_terms is not None:
         # Explicit search terms: use old path
-        all_results = run_scrapers(config, search_terms)
+        all_results = run_scrapers(config, search_terms, cache=cache, refresh=refresh, data_store=data_store)
         if not all_results:
             print("No scrape results to export.")
             return True, None, 0
@@ -87,8 +229,13 @@ def process_scrape(search_terms=None):
 
     print(f"Found {len(search_terms)} search terms from input file")
 
+    # Search each distinct term once; the export fans results back out to every row
+    unique_terms = dedupe_search_terms(search_terms)
+    print(f"Deduplicated to {len(unique_terms)} unique search terms "
+          f"({len(search_terms) / len(unique_terms):.1f}x, {len(search_terms) - len(unique_terms)} duplicates skipped)")
+
     # Run scrapers
-    all_results = run_scrapers(config, search_terms)
+    all_results = run_scrapers(config, unique_terms, cache=cache, refresh=refresh, data_store=data_store)
 
     # Generate output path and export merged Excel
     scraper_path = os.getenv("SCRAPER_PATH", "output/scraper_results.xlsx")
@@ -3,6 +3,23 @@ from abc import ABC, abstractmethod
 
 class BaseScraper(ABC):
     name: str
+    columns: dict
+    # Results of the last scrape, keyed by search term, for caching:
+    # {"row": dict | None, ...raw payloads}. Terms that failed have no entry.
+    payloads: dict
+    # Scrapers that implement async_authenticate(), async_scrape() and async_close()
+    # set this to True; run_scrapers then drives them on an event loop instead of
+    # calling the sync methods.
+    supports_async: bool = False
+
+    def configure(self, config: dict) -> None:
+        """Apply this scraper's section of scraper_config.yaml."""
+        self.columns = config.get("columns", {})
+        self.payloads = {}
+
+    def stats(self) -> dict:
+        """HTTP statistics of the last run (requests, retries, waits), printed by run_scrapers."""
+        return {}
 
     @abstractmethod
     def authenticate(self) -> bool:
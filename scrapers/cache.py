@@ -0,0 +1,64 @@
+import json
+import sqlite3
+import time
+
+
+class PriceCache:
+    """On-disk cache of scraper results, keyed by scraper name + search term.
+
+    Each entry stores the collated row (or None when nothing matched), the raw
+    payload the scraper fetched it from, and the fetch timestamp. Entries older
+    than the TTL are treated as missing."""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " scraper TEXT NOT NULL,"
+            " term TEXT NOT NULL,"
+            " row TEXT,"
+            " payload TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (scraper, term))"
+        )
+        self.conn.commit()
+
+    def get(self, scraper: str, term: str) -> tuple[bool, dict | None]:
+        """Return (hit, row) for a term. row is None for a cached "no match"."""
+        cur = self.conn.execute(
+            "SELECT row FROM results WHERE scraper = ? AND term = ? AND fetched_at >= ?",
+            (scraper, term, time.time() - self.ttl_seconds),
+        )
+        found = cur.fetchone()
+        if found is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, json.loads(found[0]) if found[0] is not None else None
+
+    def put(self, scraper: str, term: str, row: dict | None, payload) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (scraper, term, row, payload, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (
+                scraper,
+                term,
+                json.dumps(row) if row is not None else None,
+                json.dumps(payload),
+                time.time(),
+            ),
+        )
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -1,10 +1,28 @@
+import asyncio
+import json
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
 
 from scrapers.base import BaseScraper
+from scrapers.http_client import RequestPolicy
+from scrapers.session_store import SessionStore
+
+try:
+    import httpx
+except ImportError:  # optional: only needed for the async scraping path
+    httpx = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding of API responses
+    orjson = None
 
 BASE_URL = "https://www3.eoriginal.ro"
 
@@ -19,18 +37,118 @@ XHR_HEADERS = {
     "Referer": f"{BASE_URL}/search/",
 }
 
+# A page showing the login form means the session is no longer logged in
+PASSWORD_INPUT_RE = re.compile(r"""<input[^>]*name=["']password["']""", re.IGNORECASE)
+
+# The hidden XSRF input on the login page, and its value attribute
+XSRF_INPUT_RE = re.compile(r"""<input\b[^>]*\bname=["']X-XSRF-TOKEN["'][^>]*>""")
+VALUE_ATTR_RE = re.compile(r"""\bvalue=["']([^"']*)["']""")
+
+# Only the device registration form is parsed on the device check page
+DEVICE_FORM_STRAINER = SoupStrainer("form", action=re.compile(r"device/save-device"))
+
+# Statuses the site answers with once the session or its XSRF token has expired
+AUTH_EXPIRED_STATUSES = {401, 419}
+
+# doSearch + getArticles attempts per term before another worker's search is assumed
+# to keep overwriting it
+SEARCH_ATTEMPTS = 3
+
+
+class AuthExpiredError(Exception):
+    """The session is no longer logged in (login redirect, 401/419 or an HTML page instead of JSON)."""
+
+
+class SearchMismatchError(Exception):
+    """getArticles kept returning another term's articles: the session's registered search
+    was replaced by a concurrent doSearch between this term's two requests."""
+
+
+def decode_json(content: bytes):
+    """Parse a JSON response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def find_xsrf_token(html: str) -> str | None:
+    """Return the value of the page's X-XSRF-TOKEN input, or None if there is none.
+    A regex finds it without parsing the whole page; unusual markup falls back to BeautifulSoup."""
+    tag = XSRF_INPUT_RE.search(html)
+    if tag:
+        value = VALUE_ATTR_RE.search(tag.group(0))
+        if value:
+            return unescape(value.group(1))
+    token_input = BeautifulSoup(html, "html.parser").find("input", {"name": "X-XSRF-TOKEN"})
+    return token_input.get("value") if token_input else None
+
+
+def decode_api_response(r) -> dict:
+    """Return the JSON body of an API response (requests or httpx),
+    raising AuthExpiredError if the session has expired."""
+    if r.status_code in AUTH_EXPIRED_STATUSES:
+        raise AuthExpiredError(f"HTTP {r.status_code} from {r.url}")
+    # requests follows the redirect to the login page; httpx returns the redirect itself
+    redirected_to = str(r.url) if getattr(r, "history", None) else r.headers.get("location", "")
+    if "/login" in redirected_to:
+        raise AuthExpiredError(f"redirected to login page from {r.url}")
+    try:
+        return decode_json(r.content)
+    except ValueError:
+        raise AuthExpiredError(f"non-JSON response (HTTP {r.status_code}) from {r.url}") from None
+
 
 class EOriginalScraper(BaseScraper):
     name = "eoriginal"
 
     def __init__(self):
         self.session = None
+        self.client = None
         self.base_url = BASE_URL
         self.columns = {}
-
-    def _xhr_headers(self):
+        self.workers = 1
+        self.price_batch_size = 1
+        self.concurrency = 1
+        self.payloads = {}
+        self.http = RequestPolicy()
+        self.session_store = None
+        self.authenticated = False
+        # Lean search: call getArticles without registering the search with doSearch first
+        self.lean_search = False
+        self.probe_term = None
+        # Bumped on every re-login, so threads that saw the same expiry log in only once
+        self.auth_generation = 0
+        # Generation whose re-login failed: later expiries give up instead of logging in again
+        self.failed_auth_generation = None
+        self._auth_lock = threading.Lock()
+        self._semaphore = None
+
+    def configure(self, config: dict) -> None:
+        super().configure(config)
+        self.workers = config.get("workers", 1)
+        self.price_batch_size = config.get("price_batch_size", 1)
+        # Requests in flight at once on the async path
+        self.concurrency = config.get("concurrency", self.workers)
+        if config.get("async") and httpx is None:
+            print(f"[{self.name}] async requested but httpx is not installed, using threads")
+        self.supports_async = bool(config.get("async")) and httpx is not None
+        self.http = RequestPolicy.from_config(
+            config.get("http", {}), self.concurrency if self.supports_async else self.workers
+        )
+        session_file = config.get("session_file")
+        self.session_store = SessionStore(session_file) if session_file else None
+        self.probe_term = config.get("probe_term") if config.get("lean_search") else None
+        if config.get("lean_search") and not self.probe_term:
+            print(f"[{self.name}] lean_search needs a probe_term, using doSearch + getArticles")
+
+    def stats(self) -> dict:
+        return self.http.stats()
+
+    def _xhr_headers(self, cookies=None):
         """Return headers for XHR/API calls (not for HTML page loads)."""
-        xsrf = self.session.cookies.get("XSRF-TOKEN", "")
+        if cookies is None:
+            cookies = self.session.cookies
+        xsrf = cookies.get("XSRF-TOKEN", "")
         return {**XHR_HEADERS, "X-XSRF-TOKEN": xsrf}
 
     def authenticate(self) -> bool:
@@ -42,14 +160,68 @@ class EOriginalScraper(BaseScraper):
 
         self.session = requests.Session()
         self.session.headers["User-Agent"] = USER_AGENT
+        # One pooled connection per worker thread
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max(self.workers, 10)))
+
+        if self.restore_session():
+            print(f"[{self.name}] Reusing saved session")
+        else:
+            self.login(username, password)
+            print(f"[{self.name}] Authenticated successfully")
+        self.authenticated = True
+        self.save_session()
+        if self.probe_term:
+            self.lean_search = self.probe_lean_search()
+        return True
 
+    def probe_lean_search(self) -> bool:
+        """Check whether getArticles alone returns the probe term's articles, without doSearch."""
+        _, get_articles = self.search_payloads(self.probe_term)
+        try:
+            r = self.http.call(lambda: self.session.post(
+                f"{self.base_url}/search/getArticles", json=get_articles, headers=self._xhr_headers()))
+            articles = self.articles_from(decode_api_response(r))
+            supported = bool(articles and self.filter_articles(articles, self.probe_term))
+        except Exception as e:
+            print(f"[{self.name}] Lean search probe failed: {e}")
+            supported = False
+        print(f"[{self.name}] Lean search {'enabled' if supported else 'not supported, using doSearch + getArticles'}")
+        return supported
+
+    def restore_session(self) -> bool:
+        """Load the saved cookies and check with one page load that they are still logged in."""
+        if self.session_store is None:
+            return False
+        cookies = self.session_store.load()
+        if cookies is None:
+            return False
+        self.session.cookies.update(cookies)
+        try:
+            r = self.session.get(f"{self.base_url}/search/")
+            valid = r.status_code == 200 and not PASSWORD_INPUT_RE.search(r.text)
+        except requests.RequestException as e:
+            print(f"[{self.name}] Could not check saved session: {e}")
+            valid = False
+        if not valid:
+            print(f"[{self.name}] Saved session expired, logging in again")
+            self.session.cookies.clear()
+        return valid
+
+    def save_session(self) -> None:
+        if self.session_store is None or not self.authenticated:
+            return
+        try:
+            self.session_store.save(self.session.cookies)
+        except OSError as e:
+            print(f"[{self.name}] Could not save session: {e}")
+
+    def login(self, username: str, password: str) -> None:
+        """Run the full login: login page, credentials, device check."""
         # Step 1: GET login page, parse XSRF token
         r = self.session.get(self.base_url)
-        soup = BeautifulSoup(r.text, "html.parser")
-        token_input = soup.find("input", {"name": "X-XSRF-TOKEN"})
-        if not token_input:
+        token = find_xsrf_token(r.text)
+        if token is None:
             raise Exception(f"[{self.name}] Could not find XSRF token on login page")
-        token = token_input["value"]
 
         # Step 2: POST /login
         self.session.post(f"{self.base_url}/login", data={
@@ -63,8 +235,7 @@ class EOriginalScraper(BaseScraper):
 
         # Step 3: Device check
         r = self.session.get(f"{self.base_url}/device/check-device")
-        soup = BeautifulSoup(r.text, "html.parser")
-        save_form = soup.find("form", action=re.compile(r"device/save-device"))
+        save_form = BeautifulSoup(r.text, "html.parser", parse_only=DEVICE_FORM_STRAINER).find("form")
         if save_form:
             dev_token_input = save_form.find("input", {"name": "X-XSRF-TOKEN"})
             dev_token = dev_token_input["value"] if dev_token_input else token
@@ -73,33 +244,60 @@ class EOriginalScraper(BaseScraper):
                 "deviceName": "sacke",
             })
 
-        print(f"[{self.name}] Authenticated successfully")
-        return True
-
-    def search_articles(self, term: str) -> dict:
-        headers = self._xhr_headers()
+    def reauthenticate(self, generation: int) -> bool:
+        """Log in again after the session expired mid-scrape. `generation` is the
+        auth_generation the caller saw before its failed request: if another thread
+        has logged in since, its new session is used instead of logging in again.
+        Returns False if the login failed. A failed login is not retried for the same
+        generation, so bad credentials cost one login per scrape, not one per term."""
+        with self._auth_lock:
+            if self.auth_generation != generation:
+                return True
+            if self.failed_auth_generation == generation:
+                return False
+            print(f"[{self.name}] Session expired, logging in again")
+            try:
+                self.session.cookies.clear()
+                self.login(os.getenv("EORIGINAL_USER"), os.getenv("EORIGINAL_PASSWORD"))
+            except Exception as e:
+                print(f"[{self.name}] Re-login failed: {e}")
+                self.failed_auth_generation = generation
+                return False
+            self.auth_generation += 1
+            self.save_session()
+            return True
+
+    def with_reauth(self, call):
+        """Run call(); if the session has expired, log in again and retry it once."""
+        generation = self.auth_generation
+        try:
+            return call()
+        except AuthExpiredError as e:
+            print(f"[{self.name}] {e}")
+            if not self.reauthenticate(generation):
+                raise
+            return call()
 
-        # Register search
-        self.session.post(f"{self.base_url}/search/doSearch", json={
+    @staticmethod
+    def search_payloads(term: str) -> tuple[dict, dict]:
+        """Return the doSearch and getArticles request bodies for a term."""
+        do_search = {
             "search": term,
             "searchType": 0,
             "section": "auto",
             "ref": "search",
             "autoSelection": 0,
-        }, headers=headers)
-
-        # Get articles
-        r = self.session.post(f"{self.base_url}/search/getArticles", json={
+        }
+        get_articles = {
             "search": term,
             "section": "auto",
             "ref": "search-page",
-        }, headers=headers)
-        data = r.json()
-        return data.get("result", {}).get("articles", {})
-
-    def get_prices(self, articles: dict) -> dict:
-        headers = self._xhr_headers()
+        }
+        return do_search, get_articles
 
+    @staticmethod
+    def prices_payload(articles: dict) -> dict:
+        """Return the getPrices request body for the given articles (keyed by rID)."""
         ppd = {}
         for rid, art in articles.items():
             ppd[rid] = {
@@ -109,16 +307,64 @@ class EOriginalScraper(BaseScraper):
                 "ATX_SEARCH_SEQ": art["atx_search_seq"],
                 "type": art["type"],
             }
-
-        r = self.session.post(f"{self.base_url}/getPrices", json={
+        return {
             "articles": ppd,
             "qty": 1,
             "price": 1,
             "stoc": 1,
             "promo": 0,
             "source": "auto",
-        }, headers=headers)
-        return r.json().get("result", {})
+        }
+
+    @staticmethod
+    def articles_from(data) -> dict | None:
+        """Return the articles of a getArticles response, or None if there are none
+        (the endpoint sends an empty list rather than an empty object) or the response is malformed."""
+        result = data.get("result") if isinstance(data, dict) else None
+        articles = result.get("articles") if isinstance(result, dict) else None
+        return articles if isinstance(articles, dict) and articles else None
+
+    @staticmethod
+    def has_term(articles: dict | None, term: str) -> bool:
+        """True if any article is for the searched part number. getArticles returns the
+        session's last registered search, which may be another term's: the previous search
+        (lean mode, without doSearch) or a concurrent worker's doSearch."""
+        return bool(articles) and any(art.get("anr") == term for art in articles.values())
+
+    def search_articles(self, term: str) -> dict:
+        headers = self._xhr_headers()
+        do_search, get_articles = self.search_payloads(term)
+
+        def fetch_articles():
+            r = self.http.call(lambda: self.session.post(
+                f"{self.base_url}/search/getArticles", json=get_articles, headers=headers))
+            return self.articles_from(decode_api_response(r))
+
+        if self.lean_search:
+            articles = fetch_articles()
+            if self.has_term(articles, term):
+                return articles
+            # Nothing (or another part's results) back: retry the full sequence
+            # in case the search had to be registered
+
+        # Workers share the session, whose registered search is the last doSearch sent:
+        # another worker's doSearch between ours and getArticles returns its articles instead
+        for _ in range(SEARCH_ATTEMPTS):
+            # Register search
+            self.http.call(lambda: self.session.post(
+                f"{self.base_url}/search/doSearch", json=do_search, headers=headers))
+
+            # Get articles
+            articles = fetch_articles()
+            if not articles or self.has_term(articles, term):
+                return articles or {}
+        raise SearchMismatchError(f"getArticles returned another search's articles for '{term}'")
+
+    def get_prices(self, articles: dict) -> dict:
+        headers = self._xhr_headers()
+        r = self.http.call(lambda: self.session.post(
+            f"{self.base_url}/getPrices", json=self.prices_payload(articles), headers=headers))
+        return decode_api_response(r).get("result", {})
 
     @staticmethod
     def filter_articles(articles: dict, search_term: str) -> list[dict]:
@@ -171,32 +417,187 @@ class EOriginalScraper(BaseScraper):
             columns["price_stoc_ad"]: stoc_ad_price,
         }
 
-    def scrape(self, search_terms: list[str]) -> list[dict]:
-        results = []
-        for term in search_terms:
-            try:
-                articles = self.search_articles(term)
-                matched = self.filter_articles(articles, term)
-
-                if not matched:
-                    print(f"[{self.name}] No matching articles for '{term}'")
-                    continue
-
-                # Only fetch prices for matched articles
-                matched_dict = {a["rID"]: a for a in matched}
-                prices = self.get_prices(matched_dict)
+    def search_term(self, term: str) -> list[dict] | None:
+        """Search one term and return its matched articles.
+        Errors are printed and return None, so one failing term does not stop the others."""
+        try:
+            return self._match_term(term, self.with_reauth(lambda: self.search_articles(term)))
+        except Exception as e:
+            print(f"[{self.name}] Error processing '{term}': {e}")
+            return None
 
-                row = self.collate_results(matched, prices, term, self.columns)
-                if row:
-                    results.append(row)
+    def _match_term(self, term: str, articles: dict) -> list[dict]:
+        matched = self.filter_articles(articles, term)
+        if not matched:
+            print(f"[{self.name}] No matching articles for '{term}'")
+        return matched
 
+    def scrape_batch(self, terms: list[str]) -> list[dict | None]:
+        """Search each term, then fetch prices for all matched articles
+        of the batch with a single getPrices request.
+        Returns one row (or None) per term, in input order."""
+        return self.price_batch(terms, [self.search_term(term) for term in terms])
+
+    def price_batch(self, terms: list[str], matched_per_term: list) -> list[dict | None]:
+        # Only fetch prices for matched articles
+        matched_dict = {a["rID"]: a for matched in matched_per_term if matched for a in matched}
+        prices = {}
+        if matched_dict:
+            try:
+                prices = self.with_reauth(lambda: self.get_prices(matched_dict))
             except Exception as e:
-                print(f"[{self.name}] Error processing '{term}': {e}")
-                continue
+                if len(terms) == 1:
+                    print(f"[{self.name}] Error processing '{terms[0]}': {e}")
+                    return [None]
+                # Retry term by term so one bad article does not lose the whole batch
+                print(f"[{self.name}] Batched price request failed ({e}), retrying per term")
+                return [
+                    row
+                    for term, matched in zip(terms, matched_per_term)
+                    for row in self.price_batch([term], [matched])
+                ]
+        return self._collate_batch(terms, matched_per_term, prices)
+
+    def _collate_batch(self, terms: list[str], matched_per_term: list, prices: dict) -> list[dict | None]:
+        """Build one row per term from a batch's prices and record its payloads."""
+        rows = []
+        for term, matched in zip(terms, matched_per_term):
+            row = self.collate_results(matched, prices, term, self.columns) if matched else None
+            if matched is not None:
+                self.payloads[term] = {
+                    "row": row,
+                    "articles": matched,
+                    "prices": {a["rID"]: prices.get(a["rID"]) for a in matched},
+                }
+            rows.append(row)
+        return rows
+
+    def _batches(self, search_terms: list[str], parallelism: int) -> list[list[str]]:
+        # Keep every worker busy even when there are fewer terms than workers * batch size
+        per_worker = -(-len(search_terms) // parallelism) if search_terms else 1
+        batch_size = max(1, min(self.price_batch_size, per_worker))
+        return [search_terms[i:i + batch_size] for i in range(0, len(search_terms), batch_size)]
 
-        return results
+    def scrape(self, search_terms: list[str]) -> list[dict]:
+        self.payloads = {}
+        batches = self._batches(search_terms, self.workers)
+
+        if self.workers > 1:
+            # Threads share the authenticated session and its connection pool;
+            # map() returns rows in input order
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                rows = [row for batch_rows in pool.map(self.scrape_batch, batches) for row in batch_rows]
+        else:
+            rows = [row for batch in batches for row in self.scrape_batch(batch)]
+        return [row for row in rows if row]
 
     def close(self) -> None:
         if self.session:
+            # Cookies may have been refreshed during the run
+            self.save_session()
             self.session.close()
             self.session = None
+        self.authenticated = False
+
+    # --- async path (httpx), used when `async: true` is configured ---
+
+    async def async_authenticate(self) -> bool:
+        # The login is a handful of one-off page loads, so reuse the sync flow
+        # in a thread and hand its cookies to the async client
+        if not await asyncio.to_thread(self.authenticate):
+            return False
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            cookies=self.session.cookies,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            timeout=30,
+        )
+        return True
+
+    async def async_search_articles(self, term: str) -> dict:
+        headers = self._xhr_headers(self.client.cookies)
+        do_search, get_articles = self.search_payloads(term)
+
+        async def fetch_articles():
+            r = await self.http.async_call(lambda: self.client.post(
+                f"{self.base_url}/search/getArticles", json=get_articles, headers=headers))
+            return self.articles_from(decode_api_response(r))
+
+        async with self._semaphore:
+            if self.lean_search:
+                articles = await fetch_articles()
+                if self.has_term(articles, term):
+                    return articles
+            for _ in range(SEARCH_ATTEMPTS):
+                await self.http.async_call(lambda: self.client.post(
+                    f"{self.base_url}/search/doSearch", json=do_search, headers=headers))
+                articles = await fetch_articles()
+                if not articles or self.has_term(articles, term):
+                    return articles or {}
+        raise SearchMismatchError(f"getArticles returned another search's articles for '{term}'")
+
+    async def async_get_prices(self, articles: dict) -> dict:
+        headers = self._xhr_headers(self.client.cookies)
+        async with self._semaphore:
+            r = await self.http.async_call(lambda: self.client.post(
+                f"{self.base_url}/getPrices", json=self.prices_payload(articles), headers=headers))
+        return decode_api_response(r).get("result", {})
+
+    async def async_with_reauth(self, call):
+        """Async counterpart of with_reauth; the login itself runs in a thread."""
+        generation = self.auth_generation
+        try:
+            return await call()
+        except AuthExpiredError as e:
+            print(f"[{self.name}] {e}")
+            if not await asyncio.to_thread(self.reauthenticate, generation):
+                raise
+            self.client.cookies.update(self.session.cookies)
+            return await call()
+
+    async def async_search_term(self, term: str) -> list[dict] | None:
+        try:
+            return self._match_term(term, await self.async_with_reauth(lambda: self.async_search_articles(term)))
+        except Exception as e:
+            print(f"[{self.name}] Error processing '{term}': {e}")
+            return None
+
+    async def async_price_batch(self, terms: list[str], matched_per_term: list) -> list[dict | None]:
+        matched_dict = {a["rID"]: a for matched in matched_per_term if matched for a in matched}
+        prices = {}
+        if matched_dict:
+            try:
+                prices = await self.async_with_reauth(lambda: self.async_get_prices(matched_dict))
+            except Exception as e:
+                if len(terms) == 1:
+                    print(f"[{self.name}] Error processing '{terms[0]}': {e}")
+                    return [None]
+                print(f"[{self.name}] Batched price request failed ({e}), retrying per term")
+                retried = await asyncio.gather(*(
+                    self.async_price_batch([term], [matched])
+                    for term, matched in zip(terms, matched_per_term)
+                ))
+                return [row for rows in retried for row in rows]
+        return self._collate_batch(terms, matched_per_term, prices)
+
+    async def async_scrape_batch(self, terms: list[str]) -> list[dict | None]:
+        matched_per_term = await asyncio.gather(*(self.async_search_term(term) for term in terms))
+        return await self.async_price_batch(terms, list(matched_per_term))
+
+    async def async_scrape(self, search_terms: list[str]) -> list[dict]:
+        self.payloads = {}
+        # Every batch is scheduled at once; the semaphore caps requests in flight.
+        # gather() returns rows in input order.
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        batches = self._batches(search_terms, self.concurrency)
+        batch_rows = await asyncio.gather(*(self.async_scrape_batch(batch) for batch in batches))
+        return [row for rows in batch_rows for row in rows if row]
+
+    async def async_close(self) -> None:
+        if self.client:
+            # The async client got any cookies refreshed during the run; keep them for save_session
+            if self.session:
+                self.session.cookies.update(self.client.cookies.jar)
+            await self.client.aclose()
+            self.client = None
+        self.close()
@@ -0,0 +1,220 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # optional: only needed for the async scraping path
+    httpx = None
+
+# Responses worth retrying: throttled, or a transient server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Exceptions worth retrying: connection resets, timeouts
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+if httpx is not None:
+    RETRY_EXCEPTIONS += (httpx.TransportError,)
+
+
+class RetriesExhausted(Exception):
+    """Raised when a request still fails after the configured number of retries."""
+
+
+class TokenBucket:
+    """Token-bucket rate limit shared by every thread (or task) of a scraper.
+
+    reserve() takes a token and returns how long the caller must wait before
+    using it, so the bucket itself never sleeps or blocks."""
+
+    def __init__(self, rate: float | None, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens may go negative: each later caller queues behind the earlier ones
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted AIMD-style: +1 after a full window of fast
+    successes, halved on throttling, errors or slow responses (at most once
+    per cooldown, so one burst of failures does not collapse it to 1)."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1,
+                 target_latency: float | None = None, cooldown: float = 1.0):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.last_decrease = float("-inf")
+        self.cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self.cond:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait()
+            self.in_flight += 1
+
+    async def async_acquire(self) -> None:
+        # Condition.wait() would block the event loop, so poll instead
+        while not self.try_acquire():
+            await asyncio.sleep(0.01)
+
+    def release(self) -> None:
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        if self.target_latency is not None and latency > self.target_latency:
+            self.on_congestion()
+            return
+        with self.cond:
+            self.successes += 1
+            if self.successes >= self.limit:
+                self.successes = 0
+                self.limit = min(self.max_limit, self.limit + 1)
+                self.cond.notify_all()
+
+    def on_congestion(self) -> None:
+        with self.cond:
+            now = time.monotonic()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.successes = 0
+            self.limit = max(self.min_limit, self.limit // 2)
+
+
+class RequestPolicy:
+    """Rate limit, retry/backoff and adaptive concurrency around a scraper's HTTP calls.
+
+    call()/async_call() take a zero-argument function that sends one request
+    (a requests or httpx call) and return its response, retrying throttled
+    (429), 5xx and connection failures with exponential backoff."""
+
+    def __init__(self, rate: float | None = None, burst: int = 1, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 max_concurrency: int = 1, min_concurrency: int = 1,
+                 target_latency: float | None = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveLimiter(max_concurrency, min_concurrency, target_latency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats_lock = threading.Lock()
+        self.counts = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0,
+                       "rate_wait": 0.0, "backoff_wait": 0.0}
+
+    @classmethod
+    def from_config(cls, config: dict, max_concurrency: int) -> "RequestPolicy":
+        """Build from a scraper's `http` section of scraper_config.yaml."""
+        return cls(
+            rate=config.get("rate"),
+            burst=config.get("burst", 1),
+            max_retries=config.get("max_retries", 4),
+            backoff_base=config.get("backoff_base", 0.5),
+            backoff_max=config.get("backoff_max", 30.0),
+            max_concurrency=config.get("max_concurrency", max_concurrency),
+            min_concurrency=config.get("min_concurrency", 1),
+            target_latency=config.get("target_latency"),
+        )
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.counts[key] += amount
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        # Full jitter, so retries from many workers do not arrive together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _outcome(self, attempt: int, started: float, response=None, error=None) -> float | None:
+        """Record one attempt. Returns the backoff before the next attempt, or None if done."""
+        latency = time.monotonic() - started
+        self._count("requests")
+        if error is None and response.status_code not in RETRY_STATUSES:
+            self.limiter.on_success(latency)
+            return None
+        self.limiter.on_congestion()
+        if response is not None and response.status_code == 429:
+            self._count("throttled")
+        if attempt >= self.max_retries:
+            self._count("failed")
+            reason = error if error is not None else f"HTTP {response.status_code}"
+            raise RetriesExhausted(f"giving up after {attempt + 1} attempts: {reason}")
+        self._count("retries")
+        return self._backoff(attempt, response)
+
+    def call(self, send):
+        for attempt in range(self.max_retries + 1):
+            wait = self.bucket.reserve()
+            if wait:
+                self._count("rate_wait", wait)
+                time.sleep(wait)
+            self.limiter.acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = send()
+            except RETRY_EXCEPTIONS as e:
+                error = e
+            finally:
+                self.limiter.release()
+            delay = self._outcome(attempt, started, response, error)
+            if delay is None:
+                return response
+            self._count("backoff_wait", delay)
+            time.sleep(delay)
+
+    async def async_call(self, send):
+        for attempt in range(self.max_retries + 1):
+            wait = self.bucket.reserve()
+            if wait:
+                self._count("rate_wait", wait)
+                await asyncio.sleep(wait)
+            await self.limiter.async_acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = await send()
+            except RETRY_EXCEPTIONS as e:
+                error = e
+            finally:
+                self.limiter.release()
+            delay = self._outcome(attempt, started, response, error)
+            if delay is None:
+                return response
+            self._count("backoff_wait", delay)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            stats = dict(self.counts)
+        stats["concurrency"] = self.limiter.limit
+        return stats
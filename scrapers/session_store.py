@@ -0,0 +1,50 @@
+import json
+import os
+
+from requests.cookies import RequestsCookieJar
+
+# Cookie attributes kept in the session file
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "expires")
+
+
+class SessionStore:
+    """Saves a logged-in session's cookie jar (including XSRF-TOKEN) to a local
+    JSON file, so the next run can skip the login if the session is still valid.
+    The file holds live session credentials, so only its owner can read it."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> RequestsCookieJar | None:
+        """Return the saved cookie jar, or None if there is none or it is unreadable."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                cookies = json.load(f)
+            jar = RequestsCookieJar()
+            for cookie in cookies:
+                jar.set(**{field: cookie[field] for field in COOKIE_FIELDS if field in cookie})
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable session file {self.path}: {e}")
+            return None
+        return jar
+
+    def save(self, cookies: RequestsCookieJar) -> None:
+        """Save the cookie jar. The file is replaced atomically so a crash never leaves it half-written."""
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        data = [{field: getattr(cookie, field) for field in COOKIE_FIELDS} for cookie in cookies]
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # Created owner-only from the start, so the cookies are never readable by others
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
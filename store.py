@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+
+from config_loader import load_field_config
+
+load_dotenv()
+
+STORE_FILENAME = "store.sqlite"
+# Seconds to wait for another process (e.g. a scrape beside the watch daemon) to finish writing
+LOCK_TIMEOUT = 30
+
+
+def get_store_path(excel_path=None):
+    """
+    Get the path of the data store: STORE_PATH, or store.sqlite next to the Excel files (EXCEL_PATH).
+    """
+    store_path = os.getenv("STORE_PATH")
+    if store_path:
+        return store_path
+    if excel_path is None:
+        excel_path = os.getenv("EXCEL_PATH", "")
+    return os.path.join(os.path.dirname(excel_path), STORE_FILENAME)
+
+
+def _day_after(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+class DataStore:
+    """SQLite system of record for extracted orders and scraped prices.
+
+    Every email and scrape run writes here; the Excel files are exports of it.
+    Orders are indexed by order number (NrComClient), part code and email date,
+    prices by part code and scrape time. Each row is also kept whole as JSON, so
+    columns added to field_config.yaml later need no schema change.
+    An order is identified by its order number, part code and email date: recording
+    the same email again (after a failed flag, a UIDVALIDITY reset or a retried batch)
+    replaces its row instead of adding a second one.
+    Rows are buffered and written in commit(), so the database is only locked for
+    the moment of writing, not for a whole email or scrape run."""
+
+    def __init__(self, path=None, config_path="field_config.yaml"):
+        self.path = path or get_store_path()
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        config = load_field_config(config_path)
+        self.order_number_column = config.title_column
+        self.part_code_column = config.part_code_column
+        self.email_date_column = config.email_date_column
+        self.pending_orders = []
+        self.pending_prices = []
+        self.conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            " id INTEGER PRIMARY KEY,"
+            " order_number TEXT NOT NULL,"
+            " part_code TEXT NOT NULL,"
+            " email_date TEXT NOT NULL,"
+            " uid TEXT,"
+            " recorded_at REAL NOT NULL,"
+            " data TEXT NOT NULL,"
+            " UNIQUE (order_number, part_code, email_date));"
+            "CREATE INDEX IF NOT EXISTS orders_order_number ON orders (order_number);"
+            "CREATE INDEX IF NOT EXISTS orders_part_code ON orders (part_code);"
+            "CREATE INDEX IF NOT EXISTS orders_email_date ON orders (email_date);"
+            "CREATE TABLE IF NOT EXISTS prices ("
+            " id INTEGER PRIMARY KEY,"
+            " scraper TEXT NOT NULL,"
+            " part_code TEXT NOT NULL,"
+            " scraped_at TEXT NOT NULL,"
+            " data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS prices_part_code ON prices (part_code, scraped_at);"
+            "CREATE INDEX IF NOT EXISTS prices_scraped_at ON prices (scraped_at);"
+        )
+        self.conn.commit()
+
+    def add_order(self, row: dict, uid=None) -> None:
+        """Record one extracted order row (keyed by excel_column, as written to Excel)."""
+        if isinstance(uid, bytes):
+            uid = uid.decode()
+        # Missing fields are stored as "", since NULLs never collide in a UNIQUE key
+        self.pending_orders.append((
+            str(row.get(self.order_number_column) or ""),
+            str(row.get(self.part_code_column) or ""),
+            str(row.get(self.email_date_column) or ""),
+            uid,
+            time.time(),
+            json.dumps(row, default=str),
+        ))
+
+    def add_price(self, scraper: str, part_code: str, row: dict) -> None:
+        """Record one scraped result row for a (normalized) part code."""
+        self.pending_prices.append(
+            (scraper, part_code, time.strftime("%Y-%m-%d %H:%M:%S"), json.dumps(row, default=str))
+        )
+
+    def find_orders(self, order_number=None, part_code=None, date_from=None, date_to=None):
+        """
+        Yield order rows (dicts) matching all given filters, oldest email first.
+        date_from and date_to are inclusive YYYY-MM-DD days.
+        """
+        clauses, params = [], []
+        if order_number is not None:
+            clauses.append("order_number = ?")
+            params.append(order_number)
+        if part_code is not None:
+            clauses.append("part_code = ?")
+            params.append(part_code)
+        if date_from:
+            clauses.append("email_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("email_date < ?")
+            params.append(_day_after(date_to))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cur = self.conn.execute(f"SELECT data FROM orders{where} ORDER BY email_date, id", params)
+        for (data,) in cur:
+            yield json.loads(data)
+
+    def find_prices(self, part_code=None, date_from=None, date_to=None):
+        """
+        Yield scraped price rows matching all given filters, oldest first.
+        Each row has the scraper's columns plus Scraper and ScrapedAt.
+        """
+        clauses, params = [], []
+        if part_code is not None:
+            clauses.append("part_code = ?")
+            params.append(part_code)
+        if date_from:
+            clauses.append("scraped_at >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("scraped_at < ?")
+            params.append(_day_after(date_to))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cur = self.conn.execute(f"SELECT scraper, scraped_at, data FROM prices{where} ORDER BY scraped_at, id", params)
+        for scraper, scraped_at, data in cur:
+            yield {"ScrapedAt": scraped_at, "Scraper": scraper, **json.loads(data)}
+
+    def commit(self) -> None:
+        """Write the recorded rows in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO orders (order_number, part_code, email_date, uid, recorded_at, data)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                self.pending_orders,
+            )
+            self.conn.executemany(
+                "INSERT INTO prices (scraper, part_code, scraped_at, data) VALUES (?, ?, ?, ?)",
+                self.pending_prices,
+            )
+        self.pending_orders = []
+        self.pending_prices = []
+
+    def rollback(self) -> None:
+        """Drop the rows recorded since the last commit()."""
+        self.pending_orders = []
+        self.pending_prices = []
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,48 @@
+import json
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STATE_FILENAME = "sync_state.json"
+
+
+def get_state_path(excel_path=None):
+    """
+    Get the path of the sync state file, stored next to the Excel files (EXCEL_PATH).
+    """
+    if excel_path is None:
+        excel_path = os.getenv("EXCEL_PATH", "")
+    return os.path.join(os.path.dirname(excel_path), STATE_FILENAME)
+
+
+def load_state(path=None):
+    """
+    Load the inbox sync state: {'uidvalidity': int, 'last_uid': int}.
+    Returns None if no state has been saved yet or the file is unreadable.
+    """
+    path = path or get_state_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return {"uidvalidity": int(state["uidvalidity"]), "last_uid": int(state["last_uid"])}
+    except (ValueError, KeyError, TypeError, OSError) as e:
+        print(f"Warning: Ignoring unreadable sync state {path}: {e}")
+        return None
+
+
+def save_state(state, path=None):
+    """
+    Save the inbox sync state. The file is replaced atomically so a crash never leaves it half-written.
+    """
+    path = path or get_state_path()
+    dir_name = os.path.dirname(path)
+    if dir_name and not os.path.exists(dir_name):
+        os.makedirs(dir_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
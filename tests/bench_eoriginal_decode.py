@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the scraper's per-term parsing: decode_json (orjson when installed) against
+requests' json path, and the regex XSRF-token lookup against a full BeautifulSoup parse.
+Uses the getArticles/getPrices fixtures and a login page padded like the real one.
+Run from the project root: python tests/bench_eoriginal_decode.py
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from scrapers import eoriginal
+from scrapers.eoriginal import decode_json, find_xsrf_token
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LOGIN_PAGE = (
+    "<html><head>" + '<link rel="stylesheet" href="/css/app.css">' * 40 + "</head><body>"
+    + '<div class="menu"><a href="/catalog">Catalog</a><span>Piese auto originale</span></div>' * 300
+    + '<form method="post" action="/login"><input type="hidden" name="X-XSRF-TOKEN" value="abc123">'
+    '<input name="username"><input type="password" name="password"></form>'
+    + '<script>var config = {"lang": "ro"};</script>' * 20 + "</body></html>"
+)
+
+
+def load(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def per_call(fn, number):
+    return timeit.timeit(fn, number=number) / number
+
+
+def main():
+    print(f"orjson installed: {eoriginal.orjson is not None}")
+
+    # One term = one getArticles + one getPrices response
+    bodies = [load("eoriginal_articles.json"), load("eoriginal_prices.json")]
+    for body in bodies:
+        assert decode_json(body) == json.loads(body.decode("utf-8"))
+    number = 20000
+    # requests' r.json() decodes the body to text, then calls json.loads
+    slow = per_call(lambda: [json.loads(body.decode("utf-8")) for body in bodies], number)
+    fast = per_call(lambda: [decode_json(body) for body in bodies], number)
+    print(f"JSON per term:   json {slow * 1e6:8.1f} us, decode_json {fast * 1e6:8.1f} us "
+          f"({slow / fast:.1f}x, {(slow - fast) * 1e6:.1f} us saved)")
+
+    def soup_token():
+        return BeautifulSoup(LOGIN_PAGE, "html.parser").find("input", {"name": "X-XSRF-TOKEN"})["value"]
+
+    assert find_xsrf_token(LOGIN_PAGE) == soup_token() == "abc123"
+    number = 200
+    slow = per_call(soup_token, number)
+    fast = per_call(lambda: find_xsrf_token(LOGIN_PAGE), number)
+    print(f"XSRF per login ({len(LOGIN_PAGE)} chars): BeautifulSoup {slow * 1e3:8.2f} ms, "
+          f"regex {fast * 1e3:8.3f} ms ({slow / fast:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from config_loader import load_field_config
+
+CONFIG = """
+order_number:
+  excel_column: 'OrderNo'
+email_date:
+  excel_column: 'EmailDate'
+email_title:
+  pattern: 'Comanda (\\d+)'
+  excel_column: 'NrComClient'
+total:
+  pattern: 'Cantitate = (\\d+)'
+  excel_column: 'Cantitate'
+"""
+
+
+class TestLoadFieldConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "field_config.yaml")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+
+    def test_compiles_patterns_and_column_order(self):
+        config = load_field_config(self.path)
+        self.assertEqual([f.excel_column for f in config.pattern_fields], ["NrComClient", "Cantitate"])
+        self.assertEqual(config.title_pattern.search("Fw: Comanda 123").group(1), "123")
+        self.assertEqual(config.column_order, ("OrderNo", "EmailDate", "NrComClient", "Cantitate"))
+
+    def test_cached_until_file_changes(self):
+        first = load_field_config(self.path)
+        self.assertIs(load_field_config(self.path), first)
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("cost:\n  pattern: 'Pret = (\\d+)'\n  excel_column: 'Pret'\n")
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+
+        reloaded = load_field_config(self.path)
+        self.assertIsNot(reloaded, first)
+        self.assertEqual(reloaded.column_order[-1], "Pret")
+
+    def test_config_is_read_only(self):
+        config = load_field_config(self.path)
+        with self.assertRaises(TypeError):
+            config.raw["email_title"]["pattern"] = "x"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
 import json
 import os
 import unittest
+from json import dumps
 from unittest.mock import patch, MagicMock
 
+from requests.cookies import RequestsCookieJar
+
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
 
 
@@ -170,6 +173,9 @@ class TestScrapeIntegration(unittest.TestCase):
         self.scraper = EOriginalScraper.__new__(EOriginalScraper)
         self.scraper.session = MagicMock()
         self.scraper.base_url = "https://www3.eoriginal.ro"
+        self.scraper.workers = 1
+        self.scraper.price_batch_size = 1
+        self.scraper.auth_generation = 0
         self.scraper.columns = {
             "search_term": "CodArticol",
             "price_regular": "PretNormal",
@@ -243,6 +249,272 @@ class TestScrapeIntegration(unittest.TestCase):
         self.assertIsNone(results[0]["PretNormal"])
         self.assertIsNone(results[0]["PretStocAD"])
 
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "get_prices",
+    )
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "search_articles",
+    )
+    def test_concurrent_keeps_input_order_and_isolates_errors(self, mock_search, mock_prices):
+        articles = self.articles_fixture["result"]["articles"]
+
+        def side_effect(term):
+            if term == "BAD":
+                raise Exception("Network error")
+            # Same articles, relabelled with the searched part number
+            return {rid: {**art, "anr": term if art["anr"] == "31372760" else art["anr"]}
+                    for rid, art in articles.items()}
+
+        mock_search.side_effect = side_effect
+        mock_prices.return_value = self.prices_fixture["result"]
+        self.scraper.workers = 4
+
+        terms = [f"T{i}" for i in range(20)]
+        results = self.scraper.scrape(terms[:10] + ["BAD"] + terms[10:])
+        self.assertEqual([r["CodArticol"] for r in results], terms)
+
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "get_prices",
+    )
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "search_articles",
+    )
+    def test_prices_batched_across_terms(self, mock_search, mock_prices):
+        articles = self.articles_fixture["result"]["articles"]
+        prices = self.prices_fixture["result"]
+
+        def search(term):
+            # Give every term its own rIDs, as the real endpoint does
+            return {f"{rid}_{term}": {**art, "rID": f"{rid}_{term}", "anr": term}
+                    for rid, art in articles.items() if art["anr"] == "31372760"}
+
+        def get_prices(matched):
+            return {rid: prices[rid.rsplit("_", 1)[0]] for rid in matched}
+
+        mock_search.side_effect = search
+        mock_prices.side_effect = get_prices
+        self.scraper.price_batch_size = 3
+
+        results = self.scraper.scrape(["A1", "A2", "A3", "A4", "A5"])
+
+        self.assertEqual([r["CodArticol"] for r in results], ["A1", "A2", "A3", "A4", "A5"])
+        self.assertEqual(results[4]["PretNormal"], 34.2)
+        self.assertEqual(mock_prices.call_count, 2)
+        self.assertEqual(len(mock_prices.call_args_list[0][0][0]), 6)
+
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "get_prices",
+    )
+    @patch.object(
+        __import__("scrapers.eoriginal", fromlist=["EOriginalScraper"]).EOriginalScraper,
+        "search_articles",
+    )
+    def test_failed_price_batch_retried_per_term(self, mock_search, mock_prices):
+        mock_search.return_value = self.articles_fixture["result"]["articles"]
+        calls = []
+
+        def get_prices(matched):
+            calls.append(matched)
+            if len(calls) <= 2:
+                raise Exception("Server error")
+            return self.prices_fixture["result"]
+
+        mock_prices.side_effect = get_prices
+        self.scraper.price_batch_size = 2
+
+        results = self.scraper.scrape(["31372760", "31372760"])
+
+        # Batch fails, first per-term retry fails, second succeeds
+        self.assertEqual(len(results), 1)
+        self.assertEqual(mock_prices.call_count, 3)
+
+
+class TestReauthentication(unittest.TestCase):
+    """An expired session is detected, re-logged in once, and the affected terms retried."""
+
+    def setUp(self):
+        from scrapers.eoriginal import EOriginalScraper
+        self.articles = load_fixture("eoriginal_articles.json")["result"]["articles"]
+        self.prices = load_fixture("eoriginal_prices.json")["result"]
+        self.scraper = EOriginalScraper()
+        self.scraper.columns = {
+            "search_term": "CodArticol",
+            "price_regular": "PretNormal",
+            "price_stoc_ad": "PretStocAD",
+        }
+        self.scraper.session = MagicMock()
+        self.scraper.session.cookies = RequestsCookieJar()
+        self.scraper.session.post.side_effect = self.post
+        self.expired = True
+        self.relogin = patch.object(self.scraper, "login", side_effect=self.login)
+        self.mock_login = self.relogin.start()
+        self.addCleanup(self.relogin.stop)
+
+    def login(self, username, password):
+        self.expired = False
+
+    def post(self, url, json=None, headers=None):
+        r = MagicMock()
+        r.url = url
+        r.history = []
+        r.headers = {}
+        r.status_code = 200
+        r.content = b"{}"
+        if self.expired:
+            # The site serves the login page instead of the API response
+            r.content = b"<html>login</html>"
+        elif url.endswith("/getArticles"):
+            term = json["search"]
+            r.content = dumps({"result": {"articles": {
+                rid: {**art, "anr": term} for rid, art in self.articles.items() if art["anr"] == "31372760"
+            }}}).encode()
+        elif url.endswith("/getPrices"):
+            r.content = dumps({"result": self.prices}).encode()
+        return r
+
+    def test_expired_session_relogs_once_and_retries(self):
+        self.scraper.workers = 4
+        terms = [f"T{i}" for i in range(8)]
+
+        results = self.scraper.scrape(terms)
+
+        self.assertEqual([r["CodArticol"] for r in results], terms)
+        self.assertEqual(self.mock_login.call_count, 1)
+        self.assertEqual(self.scraper.auth_generation, 1)
+
+    def test_status_419_and_login_redirect_are_detected(self):
+        from scrapers.eoriginal import AuthExpiredError, decode_api_response
+
+        expired = MagicMock(status_code=419, url="https://www3.eoriginal.ro/getPrices", history=[])
+        with self.assertRaises(AuthExpiredError):
+            decode_api_response(expired)
+
+        redirected = MagicMock(status_code=200, url="https://www3.eoriginal.ro/login", history=[MagicMock()])
+        with self.assertRaises(AuthExpiredError):
+            decode_api_response(redirected)
+
+    def test_failed_relogin_drops_term(self):
+        self.mock_login.side_effect = Exception("bad credentials")
+
+        results = self.scraper.scrape(["T1"])
+
+        self.assertEqual(results, [])
+        self.assertEqual(self.scraper.auth_generation, 0)
+
+    def test_failed_relogin_is_not_repeated_per_term(self):
+        self.mock_login.side_effect = Exception("bad credentials")
+        self.scraper.workers = 4
+
+        results = self.scraper.scrape([f"T{i}" for i in range(8)])
+
+        self.assertEqual(results, [])
+        self.assertEqual(self.mock_login.call_count, 1)
+
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+@unittest.skipUnless(httpx, "httpx not installed")
+class TestAsyncScrape(unittest.TestCase):
+    """Async path — httpx client with a mock transport."""
+
+    def setUp(self):
+        from scrapers.eoriginal import EOriginalScraper
+        from scrapers.http_client import RequestPolicy
+        self.articles = load_fixture("eoriginal_articles.json")["result"]["articles"]
+        self.prices = load_fixture("eoriginal_prices.json")["result"]
+        self.scraper = EOriginalScraper()
+        self.scraper.concurrency = 3
+        self.scraper.http = RequestPolicy(max_concurrency=3)
+        self.scraper.columns = {
+            "search_term": "CodArticol",
+            "price_regular": "PretNormal",
+            "price_stoc_ad": "PretStocAD",
+        }
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request):
+        import asyncio
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        body = json.loads(request.content)
+        if request.url.path == "/search/getArticles":
+            term = body["search"]
+            if term == "BAD":
+                return httpx.Response(404, text="<html>not found</html>")
+            articles = {f"{rid}_{term}": {**art, "rID": f"{rid}_{term}", "anr": term}
+                        for rid, art in self.articles.items() if art["anr"] == "31372760"}
+            return httpx.Response(200, json={"result": {"articles": articles}})
+        if request.url.path == "/getPrices":
+            return httpx.Response(200, json={"result": {
+                rid: self.prices[rid.rsplit("_", 1)[0]] for rid in body["articles"]
+            }})
+        return httpx.Response(200, json={})
+
+    def scrape(self, terms):
+        import asyncio
+
+        async def run():
+            self.scraper.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+            try:
+                return await self.scraper.async_scrape(terms)
+            finally:
+                await self.scraper.client.aclose()
+
+        return asyncio.run(run())
+
+    def test_keeps_input_order_and_isolates_errors(self):
+        terms = [f"T{i}" for i in range(12)]
+        results = self.scrape(terms[:5] + ["BAD"] + terms[5:])
+
+        self.assertEqual([r["CodArticol"] for r in results], terms)
+        self.assertEqual(results[0]["PretNormal"], 34.2)
+        self.assertNotIn("BAD", self.scraper.payloads)
+
+    def test_concurrency_is_capped(self):
+        self.scrape([f"T{i}" for i in range(12)])
+        self.assertEqual(self.max_in_flight, 3)
+
+    def test_expired_session_relogs_once(self):
+        self.scraper.session = MagicMock()
+        self.scraper.session.cookies = RequestsCookieJar()
+        self.expired = True
+        handler = self.handler
+
+        async def expiring_handler(request):
+            if self.expired:
+                return httpx.Response(302, headers={"location": "https://www3.eoriginal.ro/login"})
+            return await handler(request)
+
+        def login(username, password):
+            self.expired = False
+
+        self.handler = expiring_handler
+        with patch.object(self.scraper, "login", side_effect=login) as mock_login:
+            results = self.scrape([f"T{i}" for i in range(6)])
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(mock_login.call_count, 1)
+
+    def test_prices_batched_across_terms(self):
+        self.scraper.price_batch_size = 4
+        results = self.scrape([f"T{i}" for i in range(8)])
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(self.scraper.payloads["T7"]["prices"]), 2)
+
 
 class TestAuthentication(unittest.TestCase):
     """Auth tests — mock HTTP responses."""
@@ -354,5 +626,183 @@ class TestAuthentication(unittest.TestCase):
         self.assertIn("device/save-device", save_call[0][0])
 
 
+class TestFastPaths(unittest.TestCase):
+    """Regex XSRF extraction and orjson decoding must agree with BeautifulSoup and json."""
+
+    def test_xsrf_token_attribute_orders(self):
+        from scrapers.eoriginal import find_xsrf_token
+        self.assertEqual(find_xsrf_token('<input type="hidden" name="X-XSRF-TOKEN" value="a&amp;b">'), "a&b")
+        self.assertEqual(find_xsrf_token("<input value='tok' name='X-XSRF-TOKEN'>"), "tok")
+        self.assertIsNone(find_xsrf_token("<html><input name=\"username\"></html>"))
+
+    def test_xsrf_token_unquoted_falls_back_to_parser(self):
+        from scrapers.eoriginal import find_xsrf_token
+        self.assertEqual(find_xsrf_token("<input name=X-XSRF-TOKEN value=tok123>"), "tok123")
+
+    def test_decode_json_with_and_without_orjson(self):
+        from scrapers.eoriginal import decode_json
+        with open(os.path.join(FIXTURES_DIR, "eoriginal_prices.json"), "rb") as f:
+            content = f.read()
+        expected = json.loads(content)
+        self.assertEqual(decode_json(content), expected)
+        with patch("scrapers.eoriginal.orjson", None):
+            self.assertEqual(decode_json(content), expected)
+            with self.assertRaises(ValueError):
+                decode_json(b"<html></html>")
+
+
+class TestLeanSearch(unittest.TestCase):
+    """Lean search skips doSearch when getArticles works alone, and falls back per term."""
+
+    def setUp(self):
+        from scrapers.eoriginal import EOriginalScraper
+        self.articles = load_fixture("eoriginal_articles.json")["result"]["articles"]
+        self.scraper = EOriginalScraper()
+        self.scraper.session = MagicMock()
+        self.scraper.session.cookies = RequestsCookieJar()
+        self.scraper.session.post.side_effect = self.post
+        self.scraper.probe_term = "31372760"
+        self.needs_registration = False
+        self.stale = False
+        # getArticles calls answered with another worker's search, as if its doSearch came in between
+        self.overtaken = 0
+        self.registered = set()
+        self.urls = []
+
+    def post(self, url, json=None, headers=None):
+        self.urls.append(url.rsplit("/", 1)[1])
+        r = MagicMock(status_code=200, url=url, history=[], headers={})
+        term = json["search"]
+        if url.endswith("/doSearch"):
+            self.registered.add(term)
+            r.content = b"{}"
+        elif self.needs_registration and term not in self.registered:
+            r.content = b'{"result": {"articles": []}}'
+        elif self.overtaken or (self.stale and term not in self.registered):
+            self.overtaken = max(0, self.overtaken - 1)
+            # The session's previous search, for another part
+            r.content = dumps({"result": {"articles": {
+                rid: {**art, "anr": "OTHER"} for rid, art in self.articles.items()
+            }}}).encode()
+        else:
+            r.content = dumps({"result": {"articles": self.articles}}).encode()
+        return r
+
+    def test_probe_enables_lean_search(self):
+        self.assertTrue(self.scraper.probe_lean_search())
+        self.assertEqual(self.urls, ["getArticles"])
+
+    def test_probe_detects_registration_needed(self):
+        self.needs_registration = True
+        self.assertFalse(self.scraper.probe_lean_search())
+
+    def test_lean_search_skips_do_search(self):
+        self.scraper.lean_search = True
+        self.assertEqual(self.scraper.search_articles("31372760"), self.articles)
+        self.assertEqual(self.urls, ["getArticles"])
+
+    def test_empty_result_falls_back_to_full_sequence(self):
+        self.scraper.lean_search = True
+        self.needs_registration = True
+        self.assertEqual(self.scraper.search_articles("31372760"), self.articles)
+        self.assertEqual(self.urls, ["getArticles", "doSearch", "getArticles"])
+
+    def test_concurrent_search_is_retried(self):
+        self.overtaken = 1
+        self.assertEqual(self.scraper.search_articles("31372760"), self.articles)
+        self.assertEqual(self.urls, ["doSearch", "getArticles", "doSearch", "getArticles"])
+
+    def test_persistent_mismatch_is_an_error_not_a_miss(self):
+        self.overtaken = 10
+        self.scraper.columns = {"search_term": "CodArticol", "price_regular": "PretNormal",
+                                "price_stoc_ad": "PretStocAD"}
+
+        self.assertEqual(self.scraper.scrape(["31372760"]), [])
+        # No payload, so the term is neither cached nor stored as "not found"
+        self.assertEqual(self.scraper.payloads, {})
+
+    def test_other_parts_results_fall_back_to_full_sequence(self):
+        self.scraper.lean_search = True
+        self.stale = True
+        self.assertEqual(self.scraper.search_articles("31372760"), self.articles)
+        self.assertEqual(self.urls, ["getArticles", "doSearch", "getArticles"])
+
+
+class TestSessionReuse(unittest.TestCase):
+    """Saved cookies are reused while valid; the full login only runs when they have expired."""
+
+    def setUp(self):
+        import tempfile
+        from scrapers.eoriginal import EOriginalScraper
+        from scrapers.session_store import SessionStore
+
+        self.store = SessionStore(os.path.join(tempfile.mkdtemp(), "session.json"))
+        jar = RequestsCookieJar()
+        jar.set("XSRF-TOKEN", "saved-token", domain="www3.eoriginal.ro")
+        self.store.save(jar)
+
+        self.scraper = EOriginalScraper()
+        self.scraper.session_store = self.store
+
+        getenv = patch("scrapers.eoriginal.os.getenv", side_effect=lambda k, d=None: {
+            "EORIGINAL_USER": "user",
+            "EORIGINAL_PASSWORD": "pass",
+        }.get(k, d))
+        getenv.start()
+        self.addCleanup(getenv.stop)
+
+    def _page(self, text):
+        page = MagicMock()
+        page.status_code = 200
+        page.text = text
+        return page
+
+    def test_store_roundtrip(self):
+        jar = self.store.load()
+        self.assertEqual(jar.get("XSRF-TOKEN"), "saved-token")
+        self.assertEqual(next(iter(jar)).domain, "www3.eoriginal.ro")
+
+    def test_session_file_is_owner_only_json(self):
+        import json
+        import stat
+        self.assertEqual(stat.S_IMODE(os.stat(self.store.path).st_mode), 0o600)
+        with open(self.store.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)[0]["name"], "XSRF-TOKEN")
+
+    def test_unreadable_session_file_is_ignored(self):
+        with open(self.store.path, "wb") as f:
+            f.write(b"\x80\x04not json")
+        self.assertIsNone(self.store.load())
+
+    @patch("scrapers.eoriginal.requests.Session")
+    def test_valid_session_skips_login(self, mock_session_cls):
+        session = mock_session_cls.return_value
+        session.cookies = RequestsCookieJar()
+        session.get.return_value = self._page("<html>search page</html>")
+
+        self.assertTrue(self.scraper.authenticate())
+
+        self.assertEqual(session.get.call_count, 1)
+        session.post.assert_not_called()
+        self.assertEqual(self.scraper._xhr_headers()["X-XSRF-TOKEN"], "saved-token")
+
+    @patch("scrapers.eoriginal.requests.Session")
+    def test_expired_session_runs_full_login(self, mock_session_cls):
+        session = mock_session_cls.return_value
+        session.cookies = RequestsCookieJar()
+        session.get.side_effect = [
+            self._page('<form><input type="password" name="password"></form>'),
+            self._page('<html><input name="X-XSRF-TOKEN" value="abc123"></html>'),
+            self._page("<html><body>Welcome back</body></html>"),
+        ]
+
+        self.assertTrue(self.scraper.authenticate())
+
+        self.assertEqual(session.get.call_count, 3)
+        self.assertIn("/login", session.post.call_args_list[0][0][0])
+        # The expired cookies are not kept
+        self.assertIsNone(self.store.load().get("XSRF-TOKEN"))
+
+
 if __name__ == "__main__":
     unittest.main()
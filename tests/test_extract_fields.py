@@ -0,0 +1,65 @@
+import re
+import unittest
+
+from config_loader import PatternField
+from extract_fields import FieldExtractor, extract_fields_from_emails, iter_fields_from_raw_emails
+from imap import parse_email_from_bytes
+
+
+def _fields(*patterns):
+    return [PatternField(f"f{i}", re.compile(p), f"Col{i}") for i, p in enumerate(patterns)]
+
+
+class TestFieldExtractor(unittest.TestCase):
+    """Each field gets its first match in the text; fields without a match are left out."""
+
+    TEXT = (
+        "Fw: Comanda Auto Total 1037-12345678901234\n"
+        "> Cod = OLD00001\n"
+        "Cod = ABCD1234\nCantitate = 5\nPret (ron, fara tva) = 150.50\n"
+    )
+
+    def test_first_match_per_field(self):
+        fields = _fields(
+            r"Comanda Auto Total 1037-(\d{14})",
+            r"Cod = ((?:\d|\w){8})",
+            r"Cantitate = (\d+)",
+            r"Pret \(ron, fara tva\) = ((?:\d|\.)+)",
+        )
+        self.assertEqual(
+            FieldExtractor(fields).extract(self.TEXT),
+            {"Col0": "12345678901234", "Col1": "OLD00001", "Col2": "5", "Col3": "150.50"},
+        )
+
+    def test_missing_field(self):
+        fields = _fields(r"Cantitate = (\d+)", r"Discount = (\d+)")
+        self.assertEqual(FieldExtractor(fields).extract(self.TEXT), {"Col0": "5"})
+
+
+class TestParallelExtraction(unittest.TestCase):
+    """Worker-process extraction must give the same rows, in the same order, as the serial path."""
+
+    def _raw(self, n):
+        return (
+            f"Subject: Fw: Comanda Auto Total 1037-{n:014d}\r\n"
+            f"From: client{n}@example.com\r\n"
+            f"Date: Mon, 20 Aug 2025 10:{n % 60:02d}:00 +0200\r\n\r\n"
+            f"Cod = ABCD{n:04d}\nCantitate = {n}\n"
+        ).encode()
+
+    def test_same_rows_as_serial(self):
+        raw_emails = [{"uid": str(n).encode(), "raw": self._raw(n)} for n in range(1, 13)]
+        serial = extract_fields_from_emails([parse_email_from_bytes(e["raw"]) for e in raw_emails])
+
+        pairs = list(iter_fields_from_raw_emails(raw_emails, workers=3))
+        emails = [email for email, _ in pairs]
+        rows = [row for _, row in pairs]
+
+        self.assertEqual(rows, serial)
+        self.assertEqual([r["OrderNo"] for r in rows], list(range(1, 13)))
+        self.assertEqual([e["uid"] for e in emails], [e["uid"] for e in raw_emails])
+        self.assertNotIn("body", emails[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from scrapers.http_client import AdaptiveLimiter, RequestPolicy, RetriesExhausted, TokenBucket
+
+
+def _response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    @patch("scrapers.http_client.time.monotonic", return_value=100.0)
+    def test_reserve_returns_wait_once_burst_is_spent(self, _):
+        bucket = TokenBucket(rate=2, burst=2)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+
+    def test_no_rate_is_unlimited(self):
+        bucket = TokenBucket(rate=None)
+        self.assertEqual(bucket.reserve(), 0.0)
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_halves_on_congestion_and_grows_back(self):
+        limiter = AdaptiveLimiter(max_limit=8, cooldown=0)
+        limiter.on_congestion()
+        limiter.on_congestion()
+        self.assertEqual(limiter.limit, 2)
+
+        for _ in range(2):
+            limiter.on_success(0.1)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_slow_response_counts_as_congestion(self):
+        limiter = AdaptiveLimiter(max_limit=8, target_latency=1.0)
+        limiter.on_success(2.0)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_cooldown_limits_decreases(self):
+        limiter = AdaptiveLimiter(max_limit=8, min_limit=1, cooldown=60)
+        for _ in range(5):
+            limiter.on_congestion()
+        self.assertEqual(limiter.limit, 4)
+
+
+@patch("scrapers.http_client.time.sleep")
+class TestRequestPolicy(unittest.TestCase):
+
+    def test_retries_throttled_and_failed_requests(self, mock_sleep):
+        policy = RequestPolicy(max_retries=3)
+        send = MagicMock(side_effect=[
+            _response(429, {"Retry-After": "2"}),
+            requests.ConnectionError("reset"),
+            _response(200),
+        ])
+
+        response = policy.call(send)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list[0][0][0], 2.0)
+        stats = policy.stats()
+        self.assertEqual((stats["requests"], stats["retries"], stats["throttled"]), (3, 2, 1))
+
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        policy = RequestPolicy(max_retries=2)
+        send = MagicMock(return_value=_response(503))
+
+        with self.assertRaises(RetriesExhausted):
+            policy.call(send)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(policy.stats()["failed"], 1)
+
+    def test_client_errors_are_not_retried(self, mock_sleep):
+        policy = RequestPolicy()
+        send = MagicMock(return_value=_response(404))
+
+        self.assertEqual(policy.call(send).status_code, 404)
+        self.assertEqual(send.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    def test_async_call_retries(self, _):
+        policy = RequestPolicy(backoff_base=0)
+        responses = iter([_response(502), _response(200)])
+
+        async def send():
+            return next(responses)
+
+        response = asyncio.run(policy.async_call(send))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(policy.stats()["retries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
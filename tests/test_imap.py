@@ -0,0 +1,309 @@
+import imaplib
+import os
+import socket
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import imap
+
+
+def _seq(uid):
+    """Sequence numbers differ from UIDs on a real server; keep them apart in the fixtures."""
+    return int(uid) % 7 + 1
+
+
+def _header_response(num, subject, size):
+    headers = f"Subject: {subject}\r\nFrom: a@example.com\r\n\r\n".encode()
+    envelope = f"{_seq(num)} (UID {num} RFC822.SIZE {size} BODY[HEADER.FIELDS (SUBJECT DATE FROM)] {{{len(headers)}}}".encode()
+    return [(envelope, headers), b")"]
+
+
+def _body_response(num, subject, body):
+    raw = f"Subject: {subject}\r\nFrom: a@example.com\r\n\r\n{body}".encode()
+    envelope = f"{_seq(num)} (UID {num} BODY[] {{{len(raw)}}}".encode()
+    return [(envelope, raw), b")"]
+
+
+def _expand(message_set):
+    """Expand an IMAP message set like '1:3,7' into ['1', '2', '3', '7']."""
+    if isinstance(message_set, bytes):
+        message_set = message_set.decode()
+    numbers = []
+    for part in message_set.split(","):
+        start, _, end = part.partition(":")
+        numbers += [str(n) for n in range(int(start), int(end or start) + 1)]
+    return numbers
+
+
+class TestHeaderPrefetch(unittest.TestCase):
+    """get_unread_emails downloads bodies only for emails whose subject matches."""
+
+    def setUp(self):
+        self.mail = MagicMock()
+        self.mail.response.return_value = ("OK", [None])
+        self.mail.status.return_value = ("NO", [None])
+        patcher = patch.object(imap, "mail", self.mail)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_matching_bodies_fetched(self):
+        subjects = {
+            b"1": "Fw: Comanda Auto Total 1037-12345678901234",
+            b"2": "Newsletter",
+        }
+
+        def uid(command, *args):
+            if command == "SEARCH":
+                return "OK", [b"1 2"]
+            message_set, items = args
+            response = []
+            for num in _expand(message_set):
+                if "HEADER.FIELDS" in items:
+                    response += _header_response(num, subjects[num.encode()], 50000)
+                else:
+                    response += _body_response(num, subjects[num.encode()], "Cod = ABCD1234")
+            return "OK", response
+
+        self.mail.uid.side_effect = uid
+
+        emails = imap.get_unread_emails()
+
+        self.assertEqual(len(emails), 1)
+        self.assertEqual(emails[0]["uid"], b"1")
+        self.assertIn("Cod = ABCD1234", emails[0]["body"])
+        body_fetches = [c for c in self.mail.uid.call_args_list if c[0][0] == "FETCH" and "HEADER.FIELDS" not in c[0][2]]
+        self.assertEqual([c[0][1] for c in body_fetches], ["1"])
+
+    def test_parse_size(self):
+        self.assertEqual(imap._parse_size(b"7 (RFC822.SIZE 1234 BODY[HEADER] {10}"), 1234)
+        self.assertEqual(imap._parse_size(b"7 (BODY[HEADER] {10}"), 0)
+
+
+class TestBatchedFetch(unittest.TestCase):
+    """fetch_in_chunks sends one UID FETCH per chunk and splits the response per message."""
+
+    def setUp(self):
+        self.mail = MagicMock()
+        patcher = patch.object(imap, "mail", self.mail)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_build_message_set_collapses_ranges(self):
+        self.assertEqual(imap.build_message_set([b"3", b"1", b"2", b"7", b"9", b"10"]), "1:3,7,9:10")
+
+    def test_parse_fetch_response_keys_by_uid(self):
+        msg_data = [(b"1 (UID 40 BODY[] {3}", b"abc"), b")", (b"2 (BODY[] {2}", b"de"), b" UID 41)"]
+        parts = imap.parse_fetch_response(msg_data)
+        self.assertEqual(parts[b"40"][1], b"abc")
+        self.assertEqual(parts[b"41"][1], b"de")
+
+    def test_parse_fetch_response_size_after_literal(self):
+        msg_data = [(b"4 (UID 4 BODY[] {3}", b"abc"), b" RFC822.SIZE 99)", (b"5 (UID 5 BODY[] {2}", b"de"), b")"]
+        parts = imap.parse_fetch_response(msg_data)
+        self.assertEqual(parts[b"4"][1], b"abc")
+        self.assertEqual(imap._parse_size(parts[b"4"][0]), 99)
+        self.assertEqual(parts[b"5"][1], b"de")
+
+    def test_one_fetch_per_chunk(self):
+        def uid(command, message_set, items):
+            response = []
+            for num in _expand(message_set):
+                response += _body_response(num, "S", f"body {num}")
+            return "OK", response
+
+        self.mail.uid.side_effect = uid
+        ids = [str(n).encode() for n in range(1, 6)]
+
+        result = list(imap.fetch_in_chunks(ids, "(BODY.PEEK[])", chunk_size=2))
+
+        self.assertEqual([num for num, _, _ in result], ids)
+        self.assertTrue(result[4][2].endswith(b"body 5"))
+        self.assertEqual([c[0][1] for c in self.mail.uid.call_args_list], ["1:2", "3:4", "5"])
+
+    def test_falls_back_to_single_fetch(self):
+        def uid(command, message_set, items):
+            if isinstance(message_set, str) and ":" in message_set:
+                raise imap.imaplib.IMAP4.error("message set too large")
+            num = _expand(message_set)[0]
+            return "OK", _body_response(num, "S", f"body {num}")
+
+        self.mail.uid.side_effect = uid
+
+        result = list(imap.fetch_in_chunks([b"1", b"2"], "(BODY.PEEK[])", chunk_size=10))
+
+        self.assertEqual([num for num, _, _ in result], [b"1", b"2"])
+
+
+
+class TestStoreFlags(unittest.TestCase):
+    """store_flags sends one UID STORE per chunk and retries failed chunks per email."""
+
+    def setUp(self):
+        self.mail = MagicMock()
+        patcher = patch.object(imap, "mail", self.mail)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_store_per_chunk(self):
+        self.mail.uid.return_value = ("OK", [])
+
+        failed = imap.store_flags([b"1", b"2", b"3"], "+FLAGS", chunk_size=2)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(
+            [c[0] for c in self.mail.uid.call_args_list],
+            [("STORE", "1:2", "+FLAGS", "\\Flagged"), ("STORE", "3", "+FLAGS", "\\Flagged")],
+        )
+
+    def test_failed_chunk_retried_per_email(self):
+        def uid(command, message_set, op, flag):
+            if message_set == "1:2" or message_set == b"2":
+                return "NO", [b"failed"]
+            return "OK", []
+
+        self.mail.uid.side_effect = uid
+
+        failed = imap.store_flags([b"1", b"2"], "-FLAGS")
+
+        self.assertEqual(failed, [b"2"])
+        self.assertEqual(self.mail.uid.call_count, 3)
+
+
+class TestIncrementalSync(unittest.TestCase):
+    """get_unread_emails only searches above the saved UID high-water mark."""
+
+    def setUp(self):
+        self.mail = MagicMock()
+        self.responses = {"UIDVALIDITY": [b"777"], "UIDNEXT": [b"51"]}
+        self.mail.response.side_effect = lambda code: (code, self.responses[code])
+        patcher = patch.object(imap, "mail", self.mail)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_new_emails_is_a_single_search(self):
+        # "UID 51:*" still returns the newest email (UID 50)
+        self.mail.uid.return_value = ("OK", [b"50"])
+
+        emails = imap.get_unread_emails(sync_state={"uidvalidity": 777, "last_uid": 50})
+
+        self.assertEqual(emails, [])
+        self.mail.uid.assert_called_once_with("SEARCH", None, "UID 51:*", "UNSEEN", "UNFLAGGED")
+        self.assertEqual(imap.last_scan, {"uidvalidity": 777, "last_uid": 50})
+
+    def test_uidvalidity_change_does_full_scan(self):
+        self.mail.uid.return_value = ("OK", [b""])
+
+        imap.get_unread_emails(sync_state={"uidvalidity": 1, "last_uid": 50})
+
+        self.mail.uid.assert_called_once_with("SEARCH", None, "UNSEEN", "UNFLAGGED")
+        self.assertEqual(imap.last_scan, {"uidvalidity": 777, "last_uid": 50})
+
+    def test_explicit_uids_skip_search_and_stop_at_last_uid(self):
+        def uid(command, *args):
+            message_set, items = args
+            return "OK", [part for num in _expand(message_set)
+                          for part in _header_response(num, "Newsletter", 100)]
+
+        self.mail.uid.side_effect = uid
+
+        emails = imap.get_unread_emails(sync_state={"uidvalidity": 777, "last_uid": 30}, uids=[b"42", b"41"])
+
+        self.assertEqual(emails, [])
+        self.assertNotIn("SEARCH", [c.args[0] for c in self.mail.uid.call_args_list])
+        # UIDNEXT is 51, but emails 43-50 may still be waiting in the watch batch
+        self.assertEqual(imap.last_scan, {"uidvalidity": 777, "last_uid": 42})
+
+    def test_state_file_roundtrip(self):
+        import sync_state
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, sync_state.STATE_FILENAME)
+            self.assertIsNone(sync_state.load_state(path))
+            sync_state.save_state({"uidvalidity": 777, "last_uid": 50}, path)
+            self.assertEqual(sync_state.load_state(path), {"uidvalidity": 777, "last_uid": 50})
+
+
+class TestIdle(unittest.TestCase):
+    """idle() speaks IDLE/DONE through imaplib's connection; poll() is the NOOP fallback."""
+
+    def setUp(self):
+        self.client, self.server = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.addCleanup(self.server.close)
+        self.mail = MagicMock()
+        self.mail.sock = self.client
+        # Lines are read through imaplib's buffered file, as IMAP4.readline does
+        self.mail.file = self.client.makefile("rb")
+        self.addCleanup(lambda: self.mail.file.close())
+        self.mail.readline.side_effect = lambda: self.mail.file.readline()
+        self.mail.tagged_commands = {}
+
+        def new_tag():
+            # As imaplib does: the tag is registered until its reply is handled
+            self.mail.tagged_commands[b"A001"] = None
+            return b"A001"
+
+        self.mail._new_tag.side_effect = new_tag
+        self.sent = []
+
+        def send(data):
+            self.sent.append(data)
+            if data == b"DONE\r\n":
+                self.server.sendall(b"A001 OK IDLE terminated\r\n")
+
+        self.mail.send.side_effect = send
+        patcher = patch.object(imap, "mail", self.mail)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_mail_ends_idle(self):
+        self.server.sendall(b"+ idling\r\n* 1 EXPUNGE\r\n* 42 EXISTS\r\n")
+        self.assertTrue(imap.idle(5))
+        self.assertEqual(self.sent, [b"A001 IDLE\r\n", b"DONE\r\n"])
+
+    def test_tag_is_released_after_reply(self):
+        self.server.sendall(b"+ idling\r\n* 42 EXISTS\r\n")
+        imap.idle(5)
+        self.assertEqual(self.mail.tagged_commands, {})
+
+    def test_timeout_without_mail(self):
+        self.server.sendall(b"+ idling\r\n")
+        self.assertFalse(imap.idle(0.05))
+        self.assertEqual(self.sent[-1], b"DONE\r\n")
+
+    def test_reads_lines_already_buffered_by_imaplib(self):
+        self.server.sendall(b"+ idling\r\n* 42 EXISTS\r\n")
+        # imaplib's file has read ahead past the continuation line
+        self.assertEqual(self.mail.file.peek(64)[:10], b"+ idling\r\n")
+        self.assertTrue(imap.idle(5))
+
+    def test_timeout_keeps_connection_usable(self):
+        self.server.sendall(b"+ idling\r\n")
+        self.assertFalse(imap.idle(0.05))
+        self.server.sendall(b"+ idling\r\n* 43 EXISTS\r\n")
+        self.assertTrue(imap.idle(5))
+        self.assertIsNone(self.client.gettimeout())
+
+    def test_dropped_connection_aborts(self):
+        self.server.sendall(b"+ idling\r\n")
+        self.server.close()
+        with self.assertRaises(imaplib.IMAP4.abort):
+            imap.idle(5)
+
+    def test_bye_aborts(self):
+        self.server.sendall(b"+ idling\r\n* BYE Autologout\r\n")
+        with self.assertRaises(imaplib.IMAP4.abort):
+            imap.idle(5)
+
+    @patch("imap.time.sleep")
+    def test_poll_reports_new_message_count(self, _):
+        self.mail.noop.return_value = ("OK", [b"NOOP completed"])
+        self.mail.response.side_effect = [("EXISTS", [None]), ("EXISTS", [b"43"])]
+        self.assertTrue(imap.poll(60))
+
+        self.mail.response.side_effect = [("EXISTS", [None]), ("EXISTS", [None])]
+        self.assertFalse(imap.poll(60))
+
+
+if __name__ == "__main__":
+    unittest.main()
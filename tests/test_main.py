@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+import main
+import store
+
+
+def _email(n):
+    return {
+        "uid": str(n).encode(),
+        "subject": f"Fw: Comanda Auto Total 1037-{n:014d}",
+        "from": "client@example.com",
+        "date": "Mon, 20 Aug 2025 10:30:00 +0200",
+        "body": f"Cod = ABCD{n:04d}\nCantitate = {n}\n",
+    }
+
+
+class TestProcessEmails(unittest.TestCase):
+    """process_emails streams emails into the workbook and flags them only after it is saved."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.out_path = os.path.join(self.tmpdir, "out.xlsx")
+        self.store_path = os.path.join(self.tmpdir, "store.sqlite")
+        patcher = patch.dict(os.environ, {"STORE_PATH": self.store_path})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for target, kwargs in [
+            ("main.excel.generate_timestamped_filename", {"return_value": self.out_path}),
+            ("main.sync_state.load_state", {"return_value": None}),
+            ("main.sync_state.save_state", {}),
+        ]:
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("main.imap.store_flags", return_value=[])
+        self.store_flags = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_streams_rows_and_flags_after_save(self):
+        def unread(**kwargs):
+            for n in range(1, 4):
+                # The file must not exist while emails are still streaming in
+                self.assertFalse(os.path.exists(self.out_path))
+                yield _email(n)
+
+        with patch("main.imap.iter_unread_emails", side_effect=unread):
+            success, path, count = main.process_emails()
+
+        self.assertTrue(success)
+        self.assertEqual((path, count), (self.out_path, 3))
+        self.store_flags.assert_called_once_with([b"1", b"2", b"3"], "+FLAGS")
+
+        ws = load_workbook(path).active
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:2], ("OrderNo", "EmailDate"))
+        self.assertEqual([r[0] for r in rows[1:]], [1, 2, 3])
+
+        data_store = store.DataStore(self.store_path)
+        self.addCleanup(data_store.close)
+        self.assertEqual([row["OrderNo"] for row in data_store.find_orders()], [1, 2, 3])
+
+    def test_failure_mid_stream_rolls_back(self):
+        def unread(**kwargs):
+            yield _email(1)
+            raise Exception("connection dropped")
+
+        with patch("main.imap.iter_unread_emails", side_effect=unread):
+            success, path, count = main.process_emails()
+
+        self.assertFalse(success)
+        self.assertIsNone(path)
+        self.assertFalse(os.path.exists(self.out_path))
+        self.store_flags.assert_called_once_with([b"1"], "-FLAGS")
+
+        data_store = store.DataStore(self.store_path)
+        self.addCleanup(data_store.close)
+        self.assertEqual(list(data_store.find_orders()), [])
+
+    def test_explicit_uids_are_passed_through(self):
+        with patch("main.imap.iter_unread_emails", return_value=iter([_email(7)])) as unread:
+            success, path, count = main.process_emails(uids=[b"7"])
+
+        self.assertEqual((success, count), (True, 1))
+        self.assertEqual(unread.call_args.kwargs["uids"], [b"7"])
+        self.store_flags.assert_called_once_with([b"7"], "+FLAGS")
+
+    def test_no_emails(self):
+        with patch("main.imap.iter_unread_emails", return_value=iter([])):
+            success, path, count = main.process_emails()
+
+        self.assertEqual((success, path, count), (True, None, 0))
+        self.store_flags.assert_not_called()
+
+
+class TestBatchesInTheSameSecond(unittest.TestCase):
+    """Watch batches flushed back to back get their own files, and both reach the master."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.excel_path = os.path.join(self.tmpdir, "data.xlsx")
+        patcher = patch.dict(os.environ, {
+            "EXCEL_PATH": self.excel_path,
+            "STORE_PATH": os.path.join(self.tmpdir, "store.sqlite"),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for target, kwargs in [
+            ("main.sync_state.load_state", {"return_value": None}),
+            ("main.sync_state.save_state", {}),
+            ("main.imap.store_flags", {"return_value": []}),
+        ]:
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Every file is created in the same second
+        patcher = patch("excel.datetime")
+        patcher.start().now.return_value = datetime(2025, 8, 20, 10, 30, 0)
+        self.addCleanup(patcher.stop)
+
+    def test_two_flushes_in_one_second(self):
+        from master import find_timestamped_files, sync_master
+
+        paths = []
+        for batch in ([_email(1), _email(2)], [_email(3)]):
+            with patch("main.imap.iter_unread_emails", return_value=iter(batch)):
+                success, path, _ = main.process_emails(uids=[e["uid"] for e in batch])
+            self.assertTrue(success)
+            paths.append(path)
+
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertEqual(find_timestamped_files(self.excel_path), paths)
+        _, files, appended, _ = sync_master(os.path.join(self.tmpdir, "master_data.xlsx"), self.excel_path)
+        self.assertEqual((files, appended), (2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
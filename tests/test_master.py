@@ -0,0 +1,101 @@
+import os
+import tempfile
+import time
+import unittest
+
+from openpyxl import load_workbook
+
+import excel
+from master import MasterWorkbook, find_timestamped_files, sync_master
+
+COLUMNS = ["OrderNo", "EmailDate", "NrComClient", "CodInitialComClient", "CantInitialaComClient"]
+
+
+class TestMasterWorkbook(unittest.TestCase):
+    """The master is built once from the timestamped files, then upserted by NrComClient."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.excel_path = os.path.join(self.tmpdir, "data.xlsx")
+        self.master_path = os.path.join(self.tmpdir, "master_data.xlsx")
+
+    def write_run(self, timestamp, rows):
+        path = os.path.join(self.tmpdir, f"{timestamp}_data.xlsx")
+        excel.write_rows(path, COLUMNS, ([n, "2025-08-20 10:30:00", key, code, qty]
+                                         for n, (key, code, qty) in enumerate(rows, start=1)))
+        return path
+
+    def master_rows(self):
+        ws = load_workbook(self.master_path, read_only=True).active
+        rows = list(ws.iter_rows(values_only=True))
+        return {row[2]: row for row in rows[1:]}
+
+    def sync(self):
+        return sync_master(self.master_path, self.excel_path)
+
+    def test_build_then_incremental_upsert(self):
+        self.write_run("2025-08-20_10-00-00", [("1001", "ABCD0001", "1"), ("1002", "ABCD0002", "2")])
+        self.write_run("2025-08-20_11-00-00", [("1002", "ABCD0002", "5"), ("1003", "ABCD0003", "3")])
+        open(os.path.join(self.tmpdir, "notes_data.xlsx"), "w").close()
+
+        _, files, appended, updated = self.sync()
+        self.assertEqual((files, appended, updated), (2, 3, 1))
+        rows = self.master_rows()
+        self.assertEqual(sorted(rows), ["1001", "1002", "1003"])
+        self.assertEqual(rows["1002"][4], "5")
+
+        # Only the new file is merged on the next run
+        self.write_run("2025-08-20_12-00-00", [("1001", "ABCD0001", "9")])
+        _, files, appended, updated = self.sync()
+        self.assertEqual((files, appended, updated), (1, 0, 1))
+        self.assertEqual(self.master_rows()["1001"][4], "9")
+        self.assertEqual(len(self.master_rows()), 3)
+
+        self.assertEqual(self.sync()[1], 0)
+
+    def test_index_rebuilt_after_master_edited_by_hand(self):
+        self.write_run("2025-08-20_10-00-00", [("1001", "ABCD0001", "1"), ("1002", "ABCD0002", "2")])
+        self.sync()
+
+        # Someone deletes the first data row in Excel: row numbers in the index are now stale
+        wb = load_workbook(self.master_path)
+        wb.active.delete_rows(2)
+        time.sleep(0.01)
+        wb.save(self.master_path)
+
+        self.write_run("2025-08-20_11-00-00", [("1002", "ABCD0002", "7")])
+        self.sync()
+
+        rows = self.master_rows()
+        self.assertEqual(list(rows), ["1002"])
+        self.assertEqual(rows["1002"][4], "7")
+
+    def test_new_columns_are_added(self):
+        master = MasterWorkbook(self.master_path).open()
+        try:
+            master.upsert({"NrComClient": "1001", "Extra": "x"})
+            master.save()
+        finally:
+            master.close()
+
+        header = next(load_workbook(self.master_path, read_only=True).active.iter_rows(values_only=True))
+        self.assertEqual(header[-1], "Extra")
+        self.assertIn("NrComClient", header)
+
+    def test_finds_only_timestamped_files(self):
+        expected = self.write_run("2025-08-20_10-00-00", [("1001", "ABCD0001", "1")])
+        self.write_run("2025-08-20_10-00-00_old", [])
+        self.assertEqual(find_timestamped_files(self.excel_path), [expected])
+
+    def test_files_from_the_same_second_are_kept_in_order(self):
+        third = self.write_run("2025-08-20_10-00-00-10", [("1001", "ABCD0001", "3")])
+        first = self.write_run("2025-08-20_10-00-00", [("1001", "ABCD0001", "1")])
+        second = self.write_run("2025-08-20_10-00-00-2", [("1001", "ABCD0001", "2")])
+        self.assertEqual(find_timestamped_files(self.excel_path), [first, second, third])
+
+        self.sync()
+        self.assertEqual(self.master_rows()["1001"][4], "3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from scrapers.base import BaseScraper
+
+
+class SlowScraper(BaseScraper):
+    """Scraper that takes `delay` seconds (or waits at `barrier`, if set) and returns one row per term."""
+    name = "slow"
+    delay = 0.2
+    barrier = None
+    closed = False
+
+    def authenticate(self) -> bool:
+        return True
+
+    def scrape(self, search_terms: list[str]) -> list[dict]:
+        self.payloads = {}
+        if self.barrier is not None:
+            # Only passes once every scraper sharing the barrier is scraping at the same time
+            self.barrier.wait(5)
+        else:
+            time.sleep(self.delay)
+        return [{"CodArticol": term, self.name: True} for term in search_terms]
+
+    def close(self) -> None:
+        type(self).closed = True
+
+
+class OtherScraper(SlowScraper):
+    name = "other"
+
+
+class HangingScraper(SlowScraper):
+    name = "hanging"
+    release = threading.Event()
+
+    def scrape(self, search_terms: list[str]) -> list[dict]:
+        self.release.wait(5)
+        return []
+
+
+class AsyncScraper(SlowScraper):
+    name = "async"
+    supports_async = True
+    calls = []
+
+    async def async_authenticate(self) -> bool:
+        self.calls.append("authenticate")
+        return True
+
+    async def async_scrape(self, search_terms: list[str]) -> list[dict]:
+        self.calls.append("scrape")
+        self.payloads = {}
+        return [{"CodArticol": term, self.name: True} for term in search_terms]
+
+    async def async_close(self) -> None:
+        self.calls.append("close")
+
+
+class NoPayloadScraper(SlowScraper):
+    """Scraper that never sets payloads."""
+    name = "no-payload"
+
+    def scrape(self, search_terms: list[str]) -> list[dict]:
+        return [{"CodArticol": term} for term in search_terms]
+
+
+class TestRunScrapersParallel(unittest.TestCase):
+
+    def test_scrapers_run_in_parallel_and_merge_in_order(self):
+        from scrape import run_scrapers
+
+        # Run one after the other, the first scraper would time out at the barrier and fail
+        barrier = threading.Barrier(2)
+        with patch("scrape.SCRAPER_CLASSES", [SlowScraper, OtherScraper]), \
+                patch.object(SlowScraper, "barrier", barrier):
+            results = run_scrapers({}, ["A1", "B2"])
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual(
+            [(r["CodArticol"], next(k for k in r if k != "CodArticol")) for r in results],
+            [("A1", "slow"), ("B2", "slow"), ("A1", "other"), ("B2", "other")],
+        )
+        self.assertTrue(SlowScraper.closed and OtherScraper.closed)
+
+    def test_timed_out_scraper_is_skipped(self):
+        from scrape import run_scrapers
+
+        config = {"hanging": {"timeout": 0.1}}
+        with patch("scrape.SCRAPER_CLASSES", [HangingScraper, OtherScraper]):
+            results = run_scrapers(config, ["A1"])
+        HangingScraper.release.set()
+
+        self.assertEqual(results, [{"CodArticol": "A1", "other": True}])
+
+    def test_async_scrapers_run_on_event_loop(self):
+        from scrape import run_scrapers
+
+        AsyncScraper.calls = []
+        with patch("scrape.SCRAPER_CLASSES", [AsyncScraper, OtherScraper]):
+            results = run_scrapers({}, ["A1"])
+
+        self.assertEqual(AsyncScraper.calls, ["authenticate", "scrape", "close"])
+        self.assertEqual(results, [{"CodArticol": "A1", "async": True}, {"CodArticol": "A1", "other": True}])
+
+    def test_scraper_without_payloads_is_not_recorded(self):
+        from scrape import run_scrapers
+
+        data_store = MagicMock()
+        with patch("scrape.SCRAPER_CLASSES", [NoPayloadScraper]):
+            results = run_scrapers({}, ["A1"], data_store=data_store)
+
+        self.assertEqual(results, [{"CodArticol": "A1"}])
+        data_store.add_price.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
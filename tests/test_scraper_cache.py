@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from scrapers.base import BaseScraper
+from scrapers.cache import PriceCache
+
+
+class FakeScraper(BaseScraper):
+    name = "fake"
+    scraped = []
+
+    def authenticate(self) -> bool:
+        return True
+
+    def scrape(self, search_terms: list[str]) -> list[dict]:
+        FakeScraper.scraped.append(list(search_terms))
+        self.payloads = {}
+        results = []
+        for term in search_terms:
+            row = {"CodArticol": term, "Pret": 1.0} if term != "NONE" else None
+            self.payloads[term] = {"row": row, "articles": []}
+            if row:
+                results.append(row)
+        return results
+
+    def close(self) -> None:
+        pass
+
+
+class TestPriceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+
+    def test_roundtrip_and_no_match(self):
+        cache = PriceCache(self.path, ttl_seconds=3600)
+        cache.put("fake", "A1", {"CodArticol": "A1", "Pret": 2.5}, {"articles": []})
+        cache.put("fake", "NONE", None, {"articles": []})
+        cache.close()
+
+        cache = PriceCache(self.path, ttl_seconds=3600)
+        self.assertEqual(cache.get("fake", "A1"), (True, {"CodArticol": "A1", "Pret": 2.5}))
+        self.assertEqual(cache.get("fake", "NONE"), (True, None))
+        self.assertEqual(cache.get("fake", "B2"), (False, None))
+        self.assertEqual(cache.get("other", "A1"), (False, None))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        cache.close()
+
+    def test_expired_entries_are_misses(self):
+        cache = PriceCache(self.path, ttl_seconds=60)
+        with patch("scrapers.cache.time.time", return_value=1000.0):
+            cache.put("fake", "A1", {"CodArticol": "A1"}, {})
+        with patch("scrapers.cache.time.time", return_value=1061.0):
+            self.assertEqual(cache.get("fake", "A1"), (False, None))
+        cache.close()
+
+
+class TestRunScrapersWithCache(unittest.TestCase):
+
+    def setUp(self):
+        FakeScraper.scraped = []
+        self.cache = PriceCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), ttl_seconds=3600)
+        self.addCleanup(self.cache.close)
+        patcher = patch("scrape.SCRAPER_CLASSES", [FakeScraper])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_run_served_from_cache(self):
+        from scrape import run_scrapers
+
+        first = run_scrapers({}, ["A1", "NONE"], cache=self.cache)
+        second = run_scrapers({}, ["A1", "NONE", "B2"], cache=self.cache)
+
+        self.assertEqual(first, [{"CodArticol": "A1", "Pret": 1.0}])
+        self.assertEqual(FakeScraper.scraped, [["A1", "NONE"], ["B2"]])
+        self.assertEqual(sorted(r["CodArticol"] for r in second), ["A1", "B2"])
+
+    def test_refresh_bypasses_cache(self):
+        from scrape import run_scrapers
+
+        run_scrapers({}, ["A1"], cache=self.cache)
+        run_scrapers({}, ["A1"], cache=self.cache, refresh=True)
+
+        self.assertEqual(FakeScraper.scraped, [["A1"], ["A1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -128,6 +128,25 @@ class TestExportScraperExcel(unittest.TestCase):
         result = excel.export_scraper_excel([], ["CodArticol"], [], "CodArticol", "/tmp/out.xlsx")
         self.assertIsNone(result)
 
+    def test_one_result_fans_out_to_duplicate_rows(self):
+        original_rows = [
+            {"CodArticol": "a100", "Qty": 1},
+            {"CodArticol": "B200", "Qty": 2},
+            {"CodArticol": " A100 ", "Qty": 3},
+        ]
+        scraper_results = [{"CodArticol": "A100", "PretNormal": 10.5}]
+        out_path = os.path.join(self.tmpdir, "out.xlsx")
+
+        excel.export_scraper_excel(original_rows, ["CodArticol", "Qty"], scraper_results, "CodArticol", out_path)
+
+        wb = load_workbook(out_path)
+        ws = wb.active
+        prices = [row[2] for row in ws.iter_rows(min_row=2, values_only=True)]
+        self.assertEqual(prices[0], 10.5)
+        self.assertIn(prices[1], ("", None))
+        self.assertEqual(prices[2], 10.5)
+        wb.close()
+
     def test_preserves_original_column_order(self):
         original_rows = [{"Z_Col": "z", "A_Col": "a", "CodArticol": "X1"}]
         original_columns = ["Z_Col", "A_Col", "CodArticol"]
@@ -165,6 +184,9 @@ class TestProcessScrapeIntegration(unittest.TestCase):
 
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
+        patcher = patch.dict(os.environ, {"STORE_PATH": os.path.join(self.tmpdir, "store.sqlite")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     @patch("scrape.run_scrapers")
     @patch("scrape.excel.read_excel_input")
@@ -209,6 +231,33 @@ class TestProcessScrapeIntegration(unittest.TestCase):
         self.assertEqual(headers, ["CodArticol", "Desc", "PretNormal", "PretStocAD"])
         wb.close()
 
+    @patch("scrape.run_scrapers")
+    @patch("scrape.excel.read_excel_input")
+    @patch("scrape.resolve_input_path")
+    @patch("scrape.excel.generate_timestamped_filename")
+    @patch("scrape.load_scraper_config")
+    def test_duplicate_terms_scraped_once(self, mock_config, mock_ts_fn, mock_resolve, mock_read, mock_run):
+        mock_config.return_value = {"input": {"id_column": "CodArticol"}}
+        mock_resolve.return_value = os.path.join(self.tmpdir, "input.xlsx")
+        mock_read.return_value = (
+            ["A100", "a100", "B200", "A100 "],
+            [{"CodArticol": t} for t in ["A100", "a100", "B200", "A100 "]],
+            ["CodArticol"],
+        )
+        mock_run.return_value = [{"CodArticol": "A100", "PretNormal": 10.5}]
+        mock_ts_fn.return_value = os.path.join(self.tmpdir, "output.xlsx")
+
+        from scrape import process_scrape
+        process_scrape()
+
+        self.assertEqual(mock_run.call_args[0][1], ["A100", "a100", "B200"])
+
+    def test_dedupe_keeps_every_spelling(self):
+        from scrape import dedupe_search_terms
+
+        # Which spelling matches the supplier's anr must not depend on input order
+        self.assertEqual(dedupe_search_terms(["a100", "A100", " c200 ", "c200"]), ["a100", "A100", "c200"])
+
     @patch("scrape.run_scrapers")
     @patch("scrape.excel.export_to_excel")
     @patch("scrape.load_scraper_config")
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+import main
+from scrape import run_scrapers
+from store import DataStore, get_store_path
+from test_scraper_cache import FakeScraper
+
+
+def _order(number, part_code, email_date):
+    return {
+        "OrderNo": 1,
+        "EmailDate": email_date,
+        "NrComClient": number,
+        "CodInitialComClient": part_code,
+        "CantInitialaComClient": "2",
+    }
+
+
+class TestDataStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "store.sqlite")
+        self.store = DataStore(self.path)
+        self.addCleanup(self.store.close)
+        self.store.add_order(_order("00000000000001", "ABCD0001", "2025-08-19 23:59:59"), uid=b"1")
+        self.store.add_order(_order("00000000000002", "ABCD0002", "2025-08-20 10:30:00"), uid=b"2")
+        self.store.add_order(_order("00000000000001", "ABCD0003", "2025-08-21 00:00:00"), uid=b"3")
+        self.store.commit()
+
+    def test_find_by_order_number_and_part_code(self):
+        rows = list(self.store.find_orders(order_number="00000000000001"))
+        self.assertEqual([r["CodInitialComClient"] for r in rows], ["ABCD0001", "ABCD0003"])
+        rows = list(self.store.find_orders(part_code="ABCD0002"))
+        self.assertEqual([r["NrComClient"] for r in rows], ["00000000000002"])
+
+    def test_date_range_is_inclusive(self):
+        rows = list(self.store.find_orders(date_from="2025-08-20", date_to="2025-08-20"))
+        self.assertEqual([r["CodInitialComClient"] for r in rows], ["ABCD0002"])
+        rows = list(self.store.find_orders(date_to="2025-08-20"))
+        self.assertEqual([r["CodInitialComClient"] for r in rows], ["ABCD0001", "ABCD0002"])
+
+    def test_rollback_drops_uncommitted_rows(self):
+        self.store.add_order(_order("00000000000004", "ABCD0004", "2025-08-22 09:00:00"))
+        self.store.rollback()
+        self.assertEqual(list(self.store.find_orders(order_number="00000000000004")), [])
+
+    def test_same_email_recorded_again_replaces_its_row(self):
+        self.store.add_order(_order("00000000000002", "ABCD0002", "2025-08-20 10:30:00"), uid=b"9")
+        self.store.commit()
+        rows = list(self.store.find_orders(order_number="00000000000002"))
+        self.assertEqual(len(rows), 1)
+
+    def test_no_lock_held_before_commit(self):
+        self.store.add_order(_order("00000000000004", "ABCD0004", "2025-08-22 09:00:00"))
+        other = DataStore(self.path)
+        self.addCleanup(other.close)
+        other.add_price("eoriginal", "A100", {"CodArticol": "A100"})
+        other.commit()
+        self.assertEqual(list(other.find_orders(order_number="00000000000004")), [])
+
+        self.store.commit()
+        self.assertEqual(len(list(other.find_orders(order_number="00000000000004"))), 1)
+
+    def test_rows_survive_reopening(self):
+        self.store.close()
+        self.store = DataStore(self.path)
+        self.assertEqual(len(list(self.store.find_orders())), 3)
+
+    def test_prices(self):
+        self.store.add_price("eoriginal", "A100", {"CodArticol": "A100", "PretNormal": 10.5})
+        self.store.commit()
+        rows = list(self.store.find_prices(part_code="A100"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["Scraper"], "eoriginal")
+        self.assertEqual(rows[0]["PretNormal"], 10.5)
+        self.assertEqual(list(self.store.find_prices(date_to="2000-01-01")), [])
+
+    @patch.dict(os.environ, {"STORE_PATH": "", "EXCEL_PATH": "output/data.xlsx"})
+    def test_default_path_next_to_excel_files(self):
+        self.assertEqual(get_store_path(), os.path.join("output", "store.sqlite"))
+
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DataStore(os.path.join(self.tmpdir, "store.sqlite"))
+        self.addCleanup(self.store.close)
+
+    def test_run_scrapers_records_fresh_results(self):
+        with patch("scrape.SCRAPER_CLASSES", [FakeScraper]):
+            run_scrapers({}, ["A100", "NONE", "B200"], data_store=self.store)
+
+        rows = list(self.store.find_prices())
+        self.assertEqual(sorted(r["CodArticol"] for r in rows), ["A100", "B200"])
+
+    def test_export_orders_in_date_range(self):
+        self.store.add_order(_order("00000000000001", "ABCD0001", "2025-08-19 08:00:00"))
+        self.store.add_order(_order("00000000000002", "ABCD0002", "2025-08-20 08:00:00"))
+        self.store.commit()
+
+        with patch.dict(os.environ, {"STORE_PATH": self.store.path}), \
+                patch("main.EXCEL_PATH", os.path.join(self.tmpdir, "data.xlsx")):
+            self.assertTrue(main.run_export(date_from="2025-08-20"))
+
+        exported = [name for name in os.listdir(self.tmpdir) if name.endswith("_export_data.xlsx")]
+        self.assertEqual(len(exported), 1)
+        ws = load_workbook(os.path.join(self.tmpdir, exported[0])).active
+        rows = list(ws.iter_rows(values_only=True))
+        col = rows[0].index("CodInitialComClient")
+        self.assertEqual([r[col] for r in rows[1:]], ["ABCD0002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
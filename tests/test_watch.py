@@ -0,0 +1,147 @@
+import imaplib
+import threading
+import unittest
+from unittest.mock import patch
+
+import watch
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """A batch is due after max_size emails or max_seconds, whichever comes first."""
+
+    def test_flush_on_size(self):
+        batcher = watch.MicroBatcher(max_size=3, max_seconds=60)
+        batcher.add([b"1", b"2"])
+        self.assertFalse(batcher.due())
+        batcher.add([b"2", b"3", b"4", b"5"])
+        self.assertTrue(batcher.due())
+        self.assertEqual(batcher.take(), [b"1", b"2", b"3"])
+        self.assertEqual(batcher.pending, [b"4", b"5"])
+        self.assertFalse(batcher.due())
+
+    @patch("watch.time.monotonic")
+    def test_flush_on_time(self, monotonic):
+        batcher = watch.MicroBatcher(max_size=50, max_seconds=30)
+        self.assertIsNone(batcher.time_left())
+        monotonic.return_value = 100.0
+        batcher.add([b"1"])
+        monotonic.return_value = 110.0
+        batcher.add([b"2"])
+        self.assertEqual(batcher.time_left(), 20.0)
+        self.assertFalse(batcher.due())
+        monotonic.return_value = 130.0
+        self.assertTrue(batcher.due())
+        self.assertEqual(batcher.take(), [b"1", b"2"])
+        self.assertIsNone(batcher.time_left())
+
+
+class TestWatch(unittest.TestCase):
+    """watch() catches up on connect, batches new mail, and reconnects with backoff after drops."""
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.calls = []
+        self.failing = []
+        for target in ("watch.imap.disconnect", "watch.time.sleep"):
+            patcher = patch(target)
+            setattr(self, target.rsplit(".", 1)[1], patcher.start())
+            self.addCleanup(patcher.stop)
+        patcher = patch("watch.imap.last_scan", {"uidvalidity": 1, "last_uid": 10})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def process(self, uids=None):
+        self.calls.append(uids)
+        if uids in self.failing:
+            self.failing.remove(uids)
+            return False
+        return True
+
+
+    def run_watch(self, waits, searches, connects=None, batcher=None):
+        waits = iter(waits)
+
+        def wait_for_mail(timeout=None):
+            result = next(waits, None)
+            if result is None:
+                self.stop.set()
+                return False
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        connects = iter(connects or [True])
+        searches = iter(searches)
+        with patch("watch.connect", side_effect=lambda: next(connects)), \
+                patch("watch.wait_for_mail", side_effect=wait_for_mail), \
+                patch("watch.imap.search_unread_uids", side_effect=lambda since: next(searches, [])) as search:
+            watch.watch(self.process, stop=self.stop, batcher=batcher)
+        return search
+
+    def test_burst_is_processed_in_batches(self):
+        search = self.run_watch(
+            waits=[True, True, True],
+            searches=[[b"11", b"12"], [b"13"], [b"14", b"15", b"16"]],
+            batcher=watch.MicroBatcher(max_size=3, max_seconds=60),
+        )
+
+        self.assertEqual(self.calls, [None, [b"11", b"12", b"13"], [b"14", b"15", b"16"]])
+        self.assertEqual([c.args[0] for c in search.call_args_list], [10, 12, 13, 16])
+
+    def test_failed_batch_is_retried_first(self):
+        self.failing = [[b"11", b"12"]]
+        batcher = watch.MicroBatcher(max_size=2, max_seconds=60)
+        self.run_watch(waits=[True, True], searches=[[b"11", b"12"], [b"13"]], batcher=batcher)
+
+        # 11-12 fail once and go back in front of 13, so 13 is not processed before them
+        self.assertEqual(self.calls, [None, [b"11", b"12"], [b"11", b"12"]])
+        self.assertEqual(batcher.pending, [b"13"])
+
+    def test_searches_after_timeout(self):
+        # Mail that arrived during process() is found even though IDLE timed out
+        self.run_watch(
+            waits=[False],
+            searches=[[b"11"]],
+            batcher=watch.MicroBatcher(max_size=1, max_seconds=60),
+        )
+
+        self.assertEqual(self.calls, [None, [b"11"]])
+
+    def test_failed_catch_up_searches_from_saved_state(self):
+        self.failing = [None]
+        with patch("watch.sync_state.load_state", return_value={"uidvalidity": 1, "last_uid": 5}), \
+                patch("watch.imap.get_uidvalidity", return_value=1):
+            search = self.run_watch(
+                waits=[True],
+                searches=[[b"6", b"7"]],
+                batcher=watch.MicroBatcher(max_size=2, max_seconds=60),
+            )
+
+        # last_scan (UID 10) came from the failed run, so it is not used
+        self.assertEqual(search.call_args_list[0].args[0], 5)
+        self.assertEqual(self.calls, [None, [b"6", b"7"]])
+
+    def test_reconnects_with_backoff(self):
+        self.run_watch(
+            waits=[True, False, imaplib.IMAP4.abort("socket error"), True],
+            searches=[[b"11"], [], [b"12"]],
+            connects=[True, False, True],
+            batcher=watch.MicroBatcher(max_size=1, max_seconds=60),
+        )
+
+        # connect + catch-up, new mail, drop, failed login, reconnect + catch-up, new mail
+        self.assertEqual(self.calls, [None, [b"11"], None, [b"12"]])
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [1, 2])
+        self.assertEqual(self.disconnect.call_count, 2)
+
+    def test_uses_idle_when_supported(self):
+        with patch("watch.imap.supports_idle", return_value=True), \
+                patch("watch.imap.idle", return_value=True) as idle, \
+                patch("watch.imap.poll") as poll:
+            self.assertTrue(watch.wait_for_mail(5))
+        idle.assert_called_once_with(5)
+        poll.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
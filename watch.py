@@ -0,0 +1,157 @@
+import imaplib
+import os
+import time
+
+from dotenv import load_dotenv
+
+import imap
+import sync_state
+
+load_dotenv()
+
+# RFC 2177: clients should re-issue IDLE at least every 29 minutes
+IDLE_TIMEOUT = 25 * 60
+# Seconds between NOOP checks on servers without IDLE
+POLL_INTERVAL = int(os.getenv("WATCH_POLL_SECONDS", 60))
+# Reconnect delays double after each failed attempt, up to this many seconds
+MAX_BACKOFF = 300
+# New emails are processed together once this many are waiting...
+BATCH_SIZE = int(os.getenv("WATCH_BATCH_SIZE", 50))
+# ...or once the first of them has waited this many seconds
+BATCH_SECONDS = float(os.getenv("WATCH_BATCH_SECONDS", 30))
+
+
+class MicroBatcher:
+    """
+    Collects the UIDs of newly arrived emails and decides when to process them:
+    once max_size are pending or the oldest has waited max_seconds, whichever comes first.
+    A burst of arrivals then produces one Excel file instead of one per email.
+    """
+
+    def __init__(self, max_size=BATCH_SIZE, max_seconds=BATCH_SECONDS):
+        self.max_size = max(1, max_size)
+        self.max_seconds = max_seconds
+        self.pending = []
+        self.first_added = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, uids):
+        new = [uid for uid in uids if uid not in self.pending]
+        if new and not self.pending:
+            self.first_added = time.monotonic()
+        self.pending.extend(new)
+
+    def time_left(self):
+        """Seconds until the pending batch must be flushed, or None if nothing is pending."""
+        if not self.pending:
+            return None
+        return max(0.0, self.first_added + self.max_seconds - time.monotonic())
+
+    def due(self):
+        return bool(self.pending) and (len(self.pending) >= self.max_size or self.time_left() == 0)
+
+    def take(self):
+        """Remove and return the next batch (up to max_size UIDs, oldest first)."""
+        batch, self.pending = self.pending[:self.max_size], self.pending[self.max_size:]
+        # Leftovers from a large burst start a new window
+        self.first_added = time.monotonic() if self.pending else None
+        return batch
+
+    def requeue(self, batch):
+        """Put a batch that failed back in front of the pending UIDs and start a new window."""
+        self.pending = list(batch) + [uid for uid in self.pending if uid not in batch]
+        self.first_added = time.monotonic() if self.pending else None
+
+    def clear(self):
+        self.pending = []
+        self.first_added = None
+
+
+def wait_for_mail(timeout=None):
+    """
+    Block until new mail may have arrived, or at most timeout seconds.
+    Returns True if the server reported new mail.
+    """
+    if imap.supports_idle():
+        return imap.idle(IDLE_TIMEOUT if timeout is None else min(timeout, IDLE_TIMEOUT))
+    return imap.poll(POLL_INTERVAL if timeout is None else min(timeout, POLL_INTERVAL))
+
+
+def saved_last_uid():
+    """The last UID of the saved sync state, or None (search everything) if the
+    mailbox's UIDVALIDITY no longer matches it."""
+    state = sync_state.load_state()
+    if state and state.get("uidvalidity") == imap.get_uidvalidity():
+        return state.get("last_uid")
+    return None
+
+
+def connect():
+    """Log in and select the inbox. Returns True on success."""
+    if not imap.authenticate():
+        return False
+    imap.mail.select("inbox")
+    mode = "IDLE" if imap.supports_idle() else f"NOOP polling every {POLL_INTERVAL}s"
+    print(f"Watching inbox ({mode})")
+    return True
+
+
+def watch(process, stop=None, batcher=None):
+    """
+    Keep one authenticated IMAP connection open and process new emails as they arrive.
+    After each (re)connect, process() runs once to pick up everything that arrived while
+    disconnected (the incremental sync state limits it to UIDs newer than the last one
+    processed; if it fails, new mail is searched above the saved sync state instead, so
+    the failed emails are retried in batches). After that, the UIDs of new emails are
+    collected in batcher and passed to process(uids) once a batch is due, so each batch
+    gives one Excel file and one flag operation, with process_emails' rollback applying
+    per batch.
+    process(uids) returns True on success. A failed batch is put back in front of the
+    queue and retried in the next window; since batches are taken oldest first, no
+    later batch can move the saved sync state past its emails.
+    After a dropped connection or failed login, reconnects with exponential backoff.
+    Runs until stop (a threading.Event) is set, or forever.
+    """
+    if batcher is None:
+        batcher = MicroBatcher()
+    backoff = 1
+    while stop is None or not stop.is_set():
+        try:
+            if not connect():
+                raise imaplib.IMAP4.abort("Login failed")
+            backoff = 1
+            # Anything still pending is picked up by the catch-up run
+            batcher.clear()
+            if process():
+                last_seen = imap.last_scan["last_uid"] if imap.last_scan else None
+            else:
+                # The failed emails are still unflagged: search from the saved state again,
+                # so they are batched and retried instead of skipped until the next reconnect
+                last_seen = saved_last_uid()
+
+            while stop is None or not stop.is_set():
+                # Search after every wake, not only when new mail was reported: an EXISTS
+                # received during process() is consumed by imaplib and not repeated
+                wait_for_mail(batcher.time_left())
+                uids = imap.search_unread_uids(last_seen)
+                if uids is None:
+                    raise imaplib.IMAP4.error("Failed to search for new emails.")
+                if uids:
+                    last_seen = int(uids[-1])
+                    batcher.add(uids)
+                    print(f"New mail arrived ({len(uids)} emails, {len(batcher)} waiting)")
+                while batcher.due():
+                    batch = batcher.take()
+                    if not process(batch):
+                        batcher.requeue(batch)
+                        break
+        except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+            print(f"IMAP connection lost: {e}")
+            imap.disconnect()
+            if stop is not None and stop.is_set():
+                break
+            print(f"Reconnecting in {backoff}s...")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)